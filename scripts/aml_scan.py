@@ -0,0 +1,172 @@
+"""
+BATCH AML SCAN
+Streams STG_TRANSACTIONS in time-range chunks across worker processes, builds
+per (account, day) partial aggregates with vectorized pandas, merges them and
+emits findings into ALERTS:
+    STRUCTURING          - many just-below-threshold amounts on one day
+    STRUCTURING_WEEKLY   - the same spread over a week
+    DORMANT_REACTIVATION - activity after a long quiet period (or since opened_at)
+"""
+import os, uuid, hashlib, oracledb, pandas as pd, numpy as np, sqlalchemy
+from datetime import timedelta
+import multiprocessing as mp
+
+from dataCleaning import USER, PWD, DSN, pwd_enc, dsn_enc, normalize_rows
+from table_specs import SPECS, ensure_table, merge_rows
+
+THRESHOLD = float(os.getenv("AML_THRESHOLD", "10000"))
+BAND = float(os.getenv("AML_BAND", "0.10"))                  # 10% under the threshold counts as "near"
+MIN_DAILY = int(os.getenv("AML_MIN_DAILY", "3"))
+MIN_WEEKLY = int(os.getenv("AML_MIN_WEEKLY", "5"))
+DORMANT_DAYS = int(os.getenv("AML_DORMANT_DAYS", "180"))
+DORMANT_MIN_AMOUNT = float(os.getenv("AML_DORMANT_MIN_AMOUNT", "5000"))
+CHUNK_DAYS = int(os.getenv("AML_CHUNK_DAYS", "7"))
+CHUNK_ROWS = int(os.getenv("AML_CHUNK_ROWS", "200000"))
+WORKERS = int(os.getenv("AML_WORKERS", str(os.cpu_count() or 1)))
+
+PARTIAL_COLS = ["n", "total", "n_near", "near_total"]
+
+_engine = None
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        _engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+    return _engine
+
+
+def partial_aggregate(df):
+    """(account_id, day) -> n, total, n_near, near_total for one chunk."""
+    df = df.dropna(subset=["src_account_id", "ts", "amount"])
+    amount = df["amount"].to_numpy(dtype=float)
+    near = (amount >= THRESHOLD * (1 - BAND)) & (amount < THRESHOLD)
+    part = pd.DataFrame({
+        "account_id": df["src_account_id"].to_numpy(),
+        "day": pd.to_datetime(df["ts"]).dt.floor("D").to_numpy(),
+        "n": 1,
+        "total": amount,
+        "n_near": near.astype(np.int64),
+        "near_total": np.where(near, amount, 0.0),
+    })
+    return part.groupby(["account_id", "day"], sort=False)[PARTIAL_COLS].sum()
+
+
+def merge_partials(partials):
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame(columns=PARTIAL_COLS,
+                            index=pd.MultiIndex.from_arrays([[], []], names=["account_id", "day"]))
+    return pd.concat(partials).groupby(level=["account_id", "day"]).sum()
+
+
+def scan_range(bounds):
+    """Worker: stream one [lo, hi) time range in row chunks and fold the partials."""
+    lo, hi = bounds
+    sql = sqlalchemy.text(
+        "SELECT src_account_id, amount, ts FROM STG_TRANSACTIONS WHERE ts >= :lo AND ts < :hi")
+    acc = None
+    rows = 0
+    for chunk in pd.read_sql_query(sql, _get_engine(), params={"lo": lo, "hi": hi}, chunksize=CHUNK_ROWS):
+        chunk.columns = [str(c).lower() for c in chunk.columns]
+        rows += len(chunk)
+        part = partial_aggregate(chunk)
+        acc = part if acc is None else merge_partials([acc, part])
+    print(f"[SCAN] {lo:%Y-%m-%d}..{hi:%Y-%m-%d}: {rows} rows")
+    return acc if acc is not None else merge_partials([])
+
+
+def time_ranges(engine):
+    bounds = pd.read_sql_query("SELECT MIN(ts) AS lo, MAX(ts) AS hi FROM STG_TRANSACTIONS", engine)
+    lo, hi = bounds.iloc[0, 0], bounds.iloc[0, 1]
+    if pd.isna(lo):
+        return []
+    start = pd.Timestamp(lo).floor("D")
+    end = pd.Timestamp(hi).floor("D") + timedelta(days=1)
+    out = []
+    while start < end:
+        stop = min(start + timedelta(days=CHUNK_DAYS), end)
+        out.append((start.to_pydatetime(), stop.to_pydatetime()))
+        start = stop
+    return out
+
+
+def _alert_rows(reason, accounts, periods, scores, created_ts):
+    rows = []
+    for acct, period, score in zip(accounts, periods, scores):
+        # deterministic ids so a re-run MERGEs onto the same alert
+        key = f"{reason}|{acct}|{pd.Timestamp(period):%Y-%m-%d}"
+        rows.append({
+            "alert_id": "AL-" + hashlib.sha1(key.encode()).hexdigest()[:16].upper(),
+            "case_id": str(uuid.uuid5(uuid.NAMESPACE_URL, key)),
+            "entity_type": "ACCOUNT",
+            "entity_id": acct,
+            "reason_code": reason,
+            "risk_score": round(float(score), 2),
+            "created_ts": created_ts,
+        })
+    return rows
+
+
+def find_alerts(daily, accounts):
+    if daily.empty:
+        return []
+    created_ts = pd.Timestamp.now().floor("s").to_pydatetime()
+    daily = daily.reset_index()
+    alerts = []
+
+    hits = daily[daily["n_near"] >= MIN_DAILY]
+    alerts += _alert_rows("STRUCTURING", hits["account_id"], hits["day"],
+                          np.minimum(100, 50 + 10 * (hits["n_near"] - MIN_DAILY)), created_ts)
+
+    daily["week"] = daily["day"].dt.to_period("W").dt.start_time
+    weekly = daily.groupby(["account_id", "week"], as_index=False)["n_near"].sum()
+    hits = weekly[weekly["n_near"] >= MIN_WEEKLY]
+    alerts += _alert_rows("STRUCTURING_WEEKLY", hits["account_id"], hits["week"],
+                          np.minimum(100, 40 + 5 * (hits["n_near"] - MIN_WEEKLY)), created_ts)
+
+    # gap to the previous active day; the first active day is measured from opened_at
+    daily = daily.sort_values(["account_id", "day"])
+    prev = daily.groupby("account_id")["day"].shift()
+    opened = daily["account_id"].map(accounts.set_index("account_id")["opened_at"])
+    prev = prev.fillna(pd.to_datetime(opened, errors="coerce"))
+    gap_days = (daily["day"] - prev).dt.days
+    hits = daily[(gap_days >= DORMANT_DAYS) & (daily["total"] >= DORMANT_MIN_AMOUNT)]
+    gaps = gap_days[hits.index]
+    alerts += _alert_rows("DORMANT_REACTIVATION", hits["account_id"], hits["day"],
+                          np.minimum(100, 40 + 20 * gaps / DORMANT_DAYS), created_ts)
+    return alerts
+
+
+def write_alerts(cur, alerts):
+    spec = SPECS["ALERTS"]
+    ensure_table(cur, spec)
+    merge_rows(cur, spec, normalize_rows(alerts))
+    print(f"Wrote {len(alerts)} alerts")
+
+
+def main():
+    engine = _get_engine()
+    ranges = time_ranges(engine)
+    accounts = pd.read_sql_query("SELECT account_id, opened_at FROM STG_ACCOUNTS", engine)
+    accounts.columns = [str(c).lower() for c in accounts.columns]
+    print(f"[SCAN] {len(ranges)} ranges of {CHUNK_DAYS} days on {WORKERS} workers")
+
+    if WORKERS > 1 and len(ranges) > 1:
+        # workers open their own engine: a forked child would inherit this one's pooled
+        # oracledb connection and share its socket with every other worker
+        engine.dispose()
+        with mp.get_context("spawn").Pool(WORKERS) as pool:
+            partials = pool.map(scan_range, ranges)
+    else:
+        partials = [scan_range(r) for r in ranges]
+
+    daily = merge_partials(partials)
+    alerts = find_alerts(daily, accounts)
+    with oracledb.connect(user=USER, password=PWD, dsn=DSN) as conn:
+        cur = conn.cursor()
+        write_alerts(cur, alerts)
+        conn.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+PARQUET ARCHIVE
+Incremental export of STG_TRANSACTIONS and STG_LOGINS to Parquet for
+investigations, partitioned by event date and sorted by entity:
+
+    archive/<table>/date=YYYY-MM/part-<from>-<n>.parquet      (ARCHIVE_PARTITION=month)
+    archive/<table>/date=YYYY-MM-DD/part-<from>-<n>.parquet   (ARCHIVE_PARTITION=day)
+
+Monthly partitions are the default: at this data volume a day holds a few
+dozen rows and opening hundreds of tiny files would dominate a 12-month query.
+
+Each file is sorted by (entity, ts) and written in small row groups, so the
+min/max statistics of the entity column bound every row group. `history`
+prunes date partitions outside the range, then row groups whose entity
+min/max cannot contain the id, and reads only what is left.
+
+Exports are incremental on STG load_ts, not on event time. The clean MERGE
+sets load_ts to SYSTIMESTAMP on insert and on an update that changes a
+column; re-MERGEing an unchanged RAW row leaves it alone, so repeated clean
+runs do not re-export (and duplicate) the whole table. STG batches carry
+arbitrary historical ts, so a second CSV load over an old date range, or an
+in-place update, is still picked up. An export takes rows with
+    watermark < load_ts <= database now - ARCHIVE_SETTLE_SEC
+writes them into the partitions of their ts (rows clean_time defaulted to
+the epoch land in date=1970-01), and only then moves the watermark in
+archive/_watermark.json to that upper bound. A failed export re-runs from the
+same watermark. A re-exported (changed) row is a newer copy; `history` keeps
+the copy with the latest load_ts. An archive written while every clean run
+re-stamped load_ts holds one copy per run; `export --full` rewrites it.
+
+Known gaps: a clean stage that commits more than ARCHIVE_SETTLE_SEC after its
+MERGE started can have rows fall behind the watermark; keep the margin above
+the longest stage or run `export --full`. If an update moves a row's ts to
+another partition, the old copy stays in the old partition and shows up
+when a query covers only that one.
+
+    python scripts/pipeline.py archive export [--full]
+    python scripts/pipeline.py archive query --table transactions --entity A-3280 --start 2024-01-01
+"""
+import os, sys, json, glob, time, shutil
+import pandas as pd
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive"))
+CHUNK_ROWS = int(os.getenv("ARCHIVE_CHUNK_ROWS", "200000"))
+ROW_GROUP_ROWS = int(os.getenv("ARCHIVE_ROW_GROUP_ROWS", "4096"))
+# rows MERGEd less than this long ago are left for the next export, so a still-running
+# clean stage cannot commit rows behind an already advanced watermark
+SETTLE_SEC = int(os.getenv("ARCHIVE_SETTLE_SEC", "3600"))
+PARTITION_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+PARTITION_FMT = PARTITION_FORMATS[os.getenv("ARCHIVE_PARTITION", "month")]
+
+# archive name -> (STG table, id column, entity column files are sorted on)
+TABLES = {
+    "transactions": ("STG_TRANSACTIONS", "txn_id", "src_account_id"),
+    "logins": ("STG_LOGINS", "login_id", "customer_id"),
+}
+
+
+def _watermark_path():
+    return os.path.join(ARCHIVE_DIR, "_watermark.json")
+
+
+def load_watermarks():
+    if not os.path.exists(_watermark_path()):
+        return {}
+    with open(_watermark_path()) as f:
+        return json.load(f)
+
+
+def save_watermark(table, ts):
+    marks = load_watermarks()
+    marks[table] = ts
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp = _watermark_path() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marks, f, indent=2)
+    os.replace(tmp, _watermark_path())
+
+
+def write_chunk(table, df, tag):
+    """Write one chunk as one file per partition, sorted by (entity, ts)."""
+    import pyarrow as pa, pyarrow.parquet as pq
+    _, id_col, key = TABLES[table]
+    df = df.dropna(subset=["ts"])
+    if df.empty:
+        return
+    df = df.assign(ts=pd.to_datetime(df["ts"]))
+    for day, part in df.groupby(df["ts"].dt.strftime(PARTITION_FMT), sort=True):
+        part = part.sort_values([key, "ts"], kind="stable")
+        out_dir = os.path.join(ARCHIVE_DIR, table, f"date={day}")
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"part-{tag}.parquet")
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), path + ".tmp",
+                       row_group_size=ROW_GROUP_ROWS, compression="zstd")
+        os.replace(path + ".tmp", path)
+
+
+def export_table(engine, table, full=False):
+    import sqlalchemy
+    from table_specs import SPECS
+    stg, _, _ = TABLES[table]
+    if full:
+        shutil.rmtree(os.path.join(ARCHIVE_DIR, table), ignore_errors=True)
+    since = None if full else load_watermarks().get(table)
+    with engine.connect() as conn:
+        # upper bound from the database clock, the same one SYSTIMESTAMP in the MERGE used
+        until = conn.execute(sqlalchemy.text(
+            "SELECT CAST(SYSTIMESTAMP AS TIMESTAMP) - NUMTODSINTERVAL(:settle, 'SECOND') FROM dual"),
+            {"settle": SETTLE_SEC}).scalar()
+    params = {"until": until}
+    if since is None:
+        # rows loaded before load_ts existed got the ALTER's default, but keep NULLs anyway
+        where = "(load_ts <= :until OR load_ts IS NULL)"
+    else:
+        where = "load_ts > :since AND load_ts <= :until"
+        params["since"] = pd.Timestamp(since).to_pydatetime()
+    cols = ", ".join(SPECS[stg].column_names)
+    sql = sqlalchemy.text(f"SELECT {cols} FROM {stg} WHERE {where} ORDER BY load_ts, {TABLES[table][1]}")
+    # file names sort in export order (history keeps the latest copy), and a re-run
+    # from the same watermark overwrites its own files
+    start_tag = "".join(ch for ch in (since or "0") if ch.isdigit()).ljust(20, "0")
+    rows = 0
+    for i, chunk in enumerate(pd.read_sql_query(sql, engine, params=params, chunksize=CHUNK_ROWS)):
+        chunk.columns = [str(c).lower() for c in chunk.columns]
+        rows += len(chunk)
+        write_chunk(table, chunk, f"{start_tag}-{i:05d}")
+    save_watermark(table, pd.Timestamp(until).strftime("%Y-%m-%dT%H:%M:%S.%f"))
+    print(f"[ARCHIVE] {table}: {rows} rows loaded in ({since or 'start'}, {until}]")
+    return rows
+
+
+def _partitions(table, start=None, end=None):
+    """Partition dirs of `table` overlapping [start, end] (dates, inclusive)."""
+    lo = pd.Timestamp(start).strftime(PARTITION_FMT) if start is not None else None
+    hi = pd.Timestamp(end).strftime(PARTITION_FMT) if end is not None else None
+    out = []
+    for d in sorted(glob.glob(os.path.join(ARCHIVE_DIR, table, "date=*"))):
+        day = os.path.basename(d)[len("date="):]
+        if (lo is None or day >= lo) and (hi is None or day <= hi):
+            out.append(d)
+    return out
+
+
+def history(table, entity_id, start=None, end=None, columns=None, stats=None):
+    """All rows of one account / customer between start and end, oldest first.
+
+    `stats`, when a dict, is filled with partition / row-group counts read and skipped.
+    """
+    import pyarrow as pa, pyarrow.parquet as pq
+    _, id_col, key = TABLES[table]
+    entity_id = str(entity_id).strip().upper()
+    stats = stats if stats is not None else {}
+    stats.update(partitions=0, files=0, row_groups=0, row_groups_skipped=0)
+    tables = []
+    for d in _partitions(table, start, end):
+        stats["partitions"] += 1
+        for path in sorted(glob.glob(os.path.join(d, "part-*.parquet"))):
+            pf = pq.ParquetFile(path)
+            stats["files"] += 1
+            key_idx = pf.schema_arrow.get_field_index(key)
+            keep = []
+            for rg in range(pf.metadata.num_row_groups):
+                st = pf.metadata.row_group(rg).column(key_idx).statistics
+                if st is not None and st.has_min_max and not (st.min <= entity_id <= st.max):
+                    stats["row_groups_skipped"] += 1
+                    continue
+                keep.append(rg)
+            stats["row_groups"] += len(keep)
+            if keep:
+                wanted = columns and sorted({*columns, key, id_col, "ts"} | ({"load_ts"} & set(pf.schema_arrow.names)))
+                tables.append(pf.read_row_groups(keep, columns=wanted))
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    df = pa.concat_tables(tables).to_pandas()
+    mask = df[key] == entity_id
+    if start is not None:
+        mask &= df["ts"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["ts"] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    # a row re-exported after a MERGE update shows up in a later file; keep the newest copy
+    df = df[mask]
+    if "load_ts" in df.columns:
+        df = df.sort_values("load_ts", kind="stable", na_position="first")
+    df = df.drop_duplicates(subset=[id_col], keep="last").sort_values("ts").reset_index(drop=True)
+    return df[columns] if columns else df
+
+
+def main(action="export", table=None, entity=None, start=None, end=None, full=False):
+    tables = [table] if table else list(TABLES)
+    if action == "export":
+        import sqlalchemy
+        from dataCleaning import USER, pwd_enc, dsn_enc
+        engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+        for t in tables:
+            export_table(engine, t, full=full)
+        return 0
+    if not entity:
+        print("[ARCHIVE] query needs --entity")
+        return 2
+    for t in tables:
+        stats = {}
+        t0 = time.perf_counter()
+        df = history(t, entity, start, end, stats=stats)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"[ARCHIVE] {t} {entity}: {len(df)} rows in {ms:.1f} ms "
+              f"({stats['partitions']} partitions, {stats['row_groups']} row groups read, "
+              f"{stats['row_groups_skipped']} skipped)")
+        if len(df):
+            print(df.to_string(index=False, max_rows=50))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
@@ -50,7 +50,7 @@ def sample_one(topic):
     finally:
         c.close()
 
-if __name__ == "__main__":
+def main():
     print(f"bootstrap: {BOOTSTRAP}")
     existing = list_topics(BOOTSTRAP)
     missing = [t for t in TOPICS if t not in existing]
@@ -65,4 +65,7 @@ if __name__ == "__main__":
             ok = sample_one(t)
             had_data = had_data or ok
 
-    sys.exit(0 if had_data else 2)
+    return 0 if had_data else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -67,671 +67,65 @@ def clean_time(val):
     except Exception:
         return "1970-01-01T00:00:00" # Default Epoch Date
 
-def stg_customer(engine,cur):
-    sql_query = "SELECT * FROM RAW_CUSTOMERS"  #change * to the columns you requre - faster
-    df = pd.read_sql(sql_query,engine)
-    df = df.copy()
-    df['customer_id'] = df['customer_id'].str.upper().str.strip()
-    df["name"] = df["name"].apply(lambda s: cleanStr(s).title() if s is not None else None)
-    df["dob"] = df["dob"].apply(parse_date)
-    df["kyc_status"] = df["kyc_status"].astype(str).str.strip().str.upper()
-    df["email"] = df["email"].astype(str).str.strip().str.lower()
-    df["phone"] = df["phone"].apply(phoneFix)
-    df["address"] = df["address"].apply(cleanStr)
-    df["zip"] = df["zip"].astype(int)
-
-    df = (
-            df.sort_values(["customer_id"])
-            .groupby("customer_id", as_index=False)
-            .agg({
-                "name": "first",
-                "dob": "first",
-                "kyc_status": "first",
-                "email": "first",
-                "phone": "first",
-                "address": "first",
-                "city": "first",
-                "state": "first",
-                "zip": "first",
-                "country": "first"
-            })
-        )
-    
-    sql_create_query = """CREATE TABLE STG_CUSTOMER (
-        customer_id   VARCHAR2(20) PRIMARY KEY,
-        name          VARCHAR2(200),
-        dob           DATE,
-        kyc_status    VARCHAR2(20),
-        email         VARCHAR2(200),
-        phone         VARCHAR2(15),
-        address       VARCHAR2(400),
-        city          VARCHAR2(60),
-        state         VARCHAR2(60),
-        zip           NUMBER(7),
-        country       VARCHAR2(60)
-    )"""
-    
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_CUSTOMER")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_CUSTOMER exists;")
-                # drop_sql = f'DROP TABLE STG_CUSTOMER'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise
-    
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows)
-    
-    sql_insert_query = """
-MERGE INTO STG_CUSTOMER d
-USING (
-  SELECT
-    :customer_id AS customer_id,
-    :name        AS name,
-    :dob AS dob,
-    :kyc_status  AS kyc_status,
-    :email       AS email,
-    :phone       AS phone,
-    :address     AS address,
-    :city        AS city,
-    :state       AS state,
-    :zip         AS zip,
-    :country     AS country
-  FROM dual
-) s
-ON (d.customer_id = s.customer_id)
-WHEN MATCHED THEN UPDATE SET
-    d.name        = s.name,
-    d.dob         = s.dob,
-    d.kyc_status  = s.kyc_status,
-    d.email       = s.email,
-    d.phone       = s.phone,
-    d.address     = s.address,
-    d.city        = s.city,
-    d.state       = s.state,
-    d.zip         = s.zip,
-    d.country     = s.country
-WHEN NOT MATCHED THEN INSERT (
-  customer_id, name, dob, kyc_status, email, phone, address, city, state, zip, country
-) VALUES (
-  s.customer_id, s.name, s.dob, s.kyc_status, s.email, s.phone, s.address, s.city, s.state, s.zip, s.country
-)
-    """
-    
-    # for i, row in enumerate(rows, start =1):
-    #     try:
-    #         cur.execute(sql_insert_query,row)
-    #     except Exception as e:
-    #         print(f"❌ Error on row {i}: {row}")
-    #         print(e)
-    #         break
+# Each stage is a thin wrapper over its declarative spec in table_specs.py;
+# the names stay because they are the stage names in runs/clean.json.
+def _run_spec(name, engine, cur):
+    from table_specs import SPECS, run_spec
+    return run_spec(engine, cur, SPECS[name])
 
-    cur.execute("ALTER SESSION DISABLE PARALLEL DML")
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+def stg_customer(engine,cur):
+    return _run_spec("STG_CUSTOMER", engine, cur)
 
 def stg_account(engine,cur):
-    sql_query = "SELECT * FROM RAW_ACCOUNTS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-
-    df["account_id"] = df["account_id"].astype(str).str.strip().str.upper()
-    df["customer_id"] = df["customer_id"].astype(str).str.strip().str.upper()
-    df["type"] = df["type"].astype(str).str.strip().str.title()
-    df["opened_at"] = df["opened_at"].apply(clean_time)
-    df["branch_id"] = df["branch_id"].astype(str).str.strip().str.upper()
-    df["balance"] = df["balance"].apply(lambda x: round(float(x), 2) if pd.notna(x) else 0.00)
- 
-    
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    
-    df.drop_duplicates()
-
-    sql_create_query = """CREATE TABLE STG_ACCOUNTS (
-        account_id    VARCHAR2(20) PRIMARY KEY,
-        customer_id   VARCHAR2(20) NOT NULL,
-        type          VARCHAR2(30),
-        balance       NUMBER(10,2),
-        currency      VARCHAR2(4),
-        status        VARCHAR2(20),
-        opened_at     DATE,
-        branch_id     VARCHAR2(20),
-        CONSTRAINT fk_acc_cust
-            FOREIGN KEY (customer_id) REFERENCES STG_CUSTOMER(customer_id)
-    )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_ACCOUNTS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_ACCOUNTS exists;")
-                # drop_sql = f'DROP TABLE STG_ACCOUNTS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise    
-
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_insert_query = """
-    MERGE INTO STG_ACCOUNTS d
-    USING (
-        SELECT
-        :account_id  AS account_id,
-        :customer_id AS customer_id,
-        :type        AS type,
-        :currency    AS currency,
-        :balance     AS balance,
-        :status      AS status,
-        TO_TIMESTAMP(:opened_at, 'YYYY-MM-DD"T"HH24:MI:SS') AS opened_at,
-        :branch_id   AS branch_id
-    FROM dual
-    ) s
-    ON (d.account_id = s.account_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.customer_id  = s.customer_id,
-        d.type         = s.type,
-        d.currency     = s.currency,
-        d.balance      = s.balance,
-        d.status       = s.status,
-        d.opened_at    = s.opened_at,
-        d.branch_id    = s.branch_id
-    WHEN NOT MATCHED THEN INSERT (
-        account_id, customer_id, type, currency, balance, status, opened_at, branch_id
-    ) VALUES (
-        s.account_id, s.customer_id, s.type, s.currency, s.balance, s.status, s.opened_at, s.branch_id
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_ACCOUNTS", engine, cur)
 
 def stg_merchant(engine,cur):
-    sql_query = "SELECT * FROM RAW_MERCHANTS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["merchant_id"] = df["merchant_id"].astype(str).str.strip().str.upper()
-    df["name"] = df["name"].apply(lambda s: cleanStr(s).title() if s is not None else None)
-    df["category"] = df["category"].apply(lambda s: cleanStr(s).title() if s is not None else None)
-
-    sql_create_query = """
-    CREATE TABLE STG_MERCHANTS (
-        merchant_id    VARCHAR2(20) PRIMARY KEY,
-        name           VARCHAR2(50) NOT NULL,
-        mcc            NUMBER(6),
-        category       VARCHAR2(50),
-        city           VARCHAR2(20),
-        state          VARCHAR2(2),
-        country_code   VARCHAR2(2)
-    )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_MERCHANTS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_MERCHANTS exists;")
-                # drop_sql = f'DROP TABLE STG_MERCHANTS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-    
-    df.drop_duplicates()
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    
-
-    sql_insert_query = """
-    MERGE INTO STG_MERCHANTS d
-    USING (
-        SELECT
-        :merchant_id    AS merchant_id,
-        :name           AS name,
-        :mcc            AS mcc,
-        :category       AS category,
-        :city           AS city,
-        :state          AS state,
-        :country_code   AS country_code
-    FROM dual
-    ) s
-    ON (d.merchant_id = s.merchant_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.name          = s.name,
-        d.mcc           = s.mcc,
-        d.category      = s.category,
-        d.city          = s.city,
-        d.state         = s.state,
-        d.country_code  = s.country_code
-    WHEN NOT MATCHED THEN INSERT (
-        merchant_id, name, mcc, category, city, state, country_code
-    ) VALUES (
-        s.merchant_id, s.name, s.mcc, s.category, s.city, s.state, s.country_code
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_MERCHANTS", engine, cur)
 
 def stg_branches(engine,cur):
-    sql_query = "SELECT * FROM RAW_BRANCHES"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["branch_id"] = df["branch_id"].astype(str).str.strip().str.upper()
-    df["name"] = df["name"].apply(lambda s: cleanStr(s).title() if s is not None else None)
-
-    
-    df.drop_duplicates()
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-    CREATE TABLE STG_BRANCHES (
-        branch_id       VARCHAR2(20) PRIMARY KEY,
-        name            VARCHAR2(50) NOT NULL,
-        city            VARCHAR2(20),
-        state           VARCHAR2(2),
-        country         VARCHAR2(20)
-    )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_BRANCHES")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_BRANCHES exists;")
-                # drop_sql = f'DROP TABLE STG_BRANCHES'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-
-    sql_insert_query = """
-    MERGE INTO STG_BRANCHES d
-    USING (
-        SELECT
-        :branch_id      AS branch_id,
-        :name           AS name,
-        :city           AS city,
-        :state          AS state,
-        :country        AS country
-    FROM dual
-    ) s
-    ON (d.branch_id = s.branch_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.name          = s.name,
-        d.city          = s.city,
-        d.state         = s.state,
-        d.country       = s.country
-    WHEN NOT MATCHED THEN INSERT (
-        branch_id, name, city, state, country
-    ) VALUES (
-        s.branch_id, s.name, s.city, s.state, s.country
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data branch loaded successfully into Oracle!")
+    return _run_spec("STG_BRANCHES", engine, cur)
 
 def stg_geo(engine,cur):
-    sql_query = "SELECT * FROM RAW_GEOS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-
-    df = df.dropna(subset=["geo_id"])
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["geo_id"] = df["geo_id"].astype(str).str.strip().str.upper()
-    df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
-    df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
-    df = df.drop_duplicates(subset=["geo_id"], keep="first") 
-
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-        CREATE TABLE STG_GEOS (
-            geo_id         VARCHAR2(20) PRIMARY KEY,
-            ip             VARCHAR2(15) NOT NULL,
-            city           VARCHAR2(20),
-            region         VARCHAR2(2),
-            country        VARCHAR2(20),
-            lat            NUMBER(9,6),
-            lon            NUMBER(9,6)
-        )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_GEOS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_GEOS exists;")
-                # drop_sql = f'DROP TABLE STG_GEOS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-
-    sql_insert_query = """
-    MERGE INTO STG_GEOS d
-    USING (
-        SELECT
-        :geo_id    AS geo_id,
-        :ip        AS ip,
-        :city      AS city,
-        :region    AS region,
-        :country   AS country,
-        :lat       AS lat,
-        :lon       AS lon
-    FROM dual
-    ) s
-    ON (d.geo_id = s.geo_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.ip        = s.ip,
-        d.city      = s.city,
-        d.region    = s.region,
-        d.country   = s.country,
-        d.lat       = s.lat,
-        d.lon       = s.lon
-    WHEN NOT MATCHED THEN INSERT (
-        geo_id, ip, city, region, country, lat, lon
-    ) VALUES (
-        s.geo_id, s.ip, s.city, s.region, s.country, s.lat, s.lon
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_GEOS", engine, cur)
 
 
 #REAL TIME DATA LOAD HERE
 
 def stg_txn(engine,cur):
-    sql_query = "SELECT * FROM RAW_TRANSACTIONS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["txn_id"] = df["txn_id"].astype(str).str.strip().str.upper()
-    df["src_account_id"] = df["src_account_id"].astype(str).str.strip().str.upper()
-    df["dst_account_id"] = df["dst_account_id"].astype(str).str.strip().str.upper()
-    df["merchant_id"] = df["merchant_id"].astype(str).str.strip().str.upper()
-    df["status"] = df["status"].astype(str).str.strip().str.upper()
-    df["ts"] = df["ts"].apply(clean_time)
-    df["amount"] = pd.to_numeric(df["amount"], errors='coerce')
-    df = df.drop_duplicates()
-    
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-        CREATE TABLE STG_TRANSACTIONS (
-            txn_id            VARCHAR2(30) PRIMARY KEY,
-            src_account_id    VARCHAR2(20) NOT NULL,
-            dst_account_id    VARCHAR2(20) NOT NULL,
-            merchant_id       VARCHAR2(20) NOT NULL,
-            amount            NUMBER(10,2),
-            currency          VARCHAR2(10),
-            channel           VARCHAR2(10),
-            ts                TIMESTAMP,
-            status            VARCHAR2(120)
-        )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_TRANSACTIONS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_TRANSACTIONS exists;")
-                # drop_sql = f'DROP TABLE STG_TRANSACTIONS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-
-    sql_insert_query = """
-    MERGE INTO STG_TRANSACTIONS d
-    USING (
-        SELECT
-        :txn_id                 AS txn_id,
-        :src_account_id         AS src_account_id,
-        :dst_account_id        AS dst_account_id,
-        :merchant_id            AS merchant_id,
-        :amount                 AS amount,
-        :currency               AS currency,
-        :channel                AS channel,
-        :status                 AS status,
-        TO_TIMESTAMP(:ts,'YYYY-MM-DD"T"HH24:MI:SS') AS ts
-    FROM dual
-    ) s
-    ON (d.txn_id = s.txn_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.src_account_id        = s.src_account_id,
-        d.dst_account_id       = s.dst_account_id,
-        d.merchant_id           = s.merchant_id,
-        d.amount                = s.amount,
-        d.currency              = s.currency,
-        d.channel               = s.channel,
-        d.status                = s.status,
-        d.ts                    = s.ts
-    WHEN NOT MATCHED THEN INSERT (
-        txn_id, src_account_id, dst_account_id, merchant_id, amount, currency, channel, status, ts
-    ) VALUES (
-        s.txn_id, s.src_account_id, s.dst_account_id, s.merchant_id, s.amount, s.currency, s.channel, s.status, s.ts
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_TRANSACTIONS", engine, cur)
 
 def stg_logins(engine, cur):
-    sql_query = "SELECT * FROM RAW_LOGINS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["login_id"] = df["login_id"].astype(str).str.strip().str.upper()
-    df["customer_id"] = df["customer_id"].astype(str).str.strip().str.upper()
-    df["device_id"] = df["device_id"].astype(str).str.strip().str.upper()
-    df["geo_id"] = df["geo_id"].astype(str).str.strip().str.upper()
-    df["ts"] = df["ts"].apply(clean_time)
-    df = df.drop_duplicates()
-
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-        CREATE TABLE STG_LOGINS (
-            login_id            VARCHAR2(30) PRIMARY KEY,
-            customer_id         VARCHAR2(20) NOT NULL,
-            device_id           VARCHAR2(20) NOT NULL,
-            geo_id              VARCHAR2(20) NOT NULL,
-            channel           VARCHAR2(10),
-            ts                TIMESTAMP,
-            result            VARCHAR2(120)
-        )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_LOGINS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table  STG_LOGINS exists;")
-                # drop_sql = f'DROP TABLE STG_LOGINS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-
-    sql_insert_query = """
-    MERGE INTO STG_LOGINS d
-    USING (
-        SELECT
-        :login_id                 AS login_id,
-        :customer_id              AS customer_id,
-        :device_id                AS device_id,
-        :geo_id                   AS geo_id,
-        :channel                  AS channel,
-        :result                   AS result,
-        TO_TIMESTAMP(:ts,'YYYY-MM-DD"T"HH24:MI:SS') AS ts
-    FROM dual
-    ) s
-    ON (d.login_id = s.login_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.customer_id         = s.customer_id,
-        d.device_id           = s.device_id,
-        d.geo_id                = s.geo_id,
-        d.channel               = s.channel,
-        d.result                = s.result,
-        d.ts                    = s.ts
-    WHEN NOT MATCHED THEN INSERT (
-        login_id, customer_id, device_id, geo_id, channel, result, ts
-    ) VALUES (
-        s.login_id, s.customer_id, s.device_id, s.geo_id, s.channel, s.result, s.ts
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_LOGINS", engine, cur)
 
 def stg_devices(engine, cur):
-    sql_query = "SELECT * FROM RAW_DEVICES"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["device_id"] = df["device_id"].astype(str).str.strip().str.upper()
-    df["os"] = df["os"].astype(str).str.strip().str.upper()
-    df = df.drop_duplicates()
-
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-        CREATE TABLE STG_DEVICES (
-            device_id           VARCHAR2(30) PRIMARY KEY,
-            fingerprint         VARCHAR2(100) NOT NULL,
-            os                  VARCHAR2(50) NOT NULL,
-            model               VARCHAR2(100) NOT NULL
-        )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_DEVICES")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table STG_DEVICES exists;")
-                # drop_sql = f'DROP TABLE STG_DEVICES'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-    
-    sql_insert_query = """
-    MERGE INTO STG_DEVICES d
-    USING (
-        SELECT
-        :device_id                 AS device_id,
-        :fingerprint               AS fingerprint,
-        :os                        AS os,
-        :model                     AS model
-    FROM dual
-    ) s
-    ON (d.device_id = s.device_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.fingerprint         = s.fingerprint,
-        d.os                  = s.os,
-        d.model               = s.model
-    WHEN NOT MATCHED THEN INSERT (
-        device_id, fingerprint, os, model
-    ) VALUES (
-        s.device_id, s.fingerprint, s.os, s.model
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
+    return _run_spec("STG_DEVICES", engine, cur)
 
 def stg_sanction(engine, cur):
-    sql_query = "SELECT * FROM RAW_SANCTIONS"
-    df = pd.read_sql_query(sql_query,engine)
-    df = df.copy()
-    df = df.drop(['ingest_ts','source_file','rownum_in_file'],axis=1)
-    df["sanction_id"] = df["sanction_id"].astype(str).str.strip().str.upper()
-    df["entity_name"] = df["entity_name"].apply(lambda s: cleanStr(s).title() if s is not None else None)
-    df = df.drop_duplicates()
-
-    rows = df.to_dict(orient="records")
-    rows = normalize_rows(rows) # to avoid TypeError: Expected str, got quoted_name
-
-    sql_create_query = """
-        CREATE TABLE STG_SANCTIONS (
-            sanction_id             VARCHAR2(30) PRIMARY KEY,
-            list_name               VARCHAR2(100) NOT NULL,
-            entity_name             VARCHAR2(100) NOT NULL,
-            risk_level              VARCHAR2(10) NOT NULL
-        )
-    """
-    try:
-        cur.execute(sql_create_query)
-        print(f"[STG] Created STG_SANCTIONS")
-    except oracledb.DatabaseError as e:
-            msg = str(e).lower()
-            if "ora-00955" in msg or "name is already used" in msg:
-                print(f"Table STG_SANCTIONS exists;")
-                # drop_sql = f'DROP TABLE STG_SANCTIONS'
-                # print(drop_sql)
-                # cur.execute(drop_sql)
-            else:
-                raise  
-    
-    sql_insert_query = """
-    MERGE INTO STG_SANCTIONS d
-    USING (
-        SELECT
-        :sanction_id                    AS sanction_id,
-        :list_name                      AS list_name,
-        :entity_name                    AS entity_name,
-        :risk_level                     AS risk_level
-    FROM dual
-    ) s
-    ON (d.sanction_id = s.sanction_id)
-    WHEN MATCHED THEN UPDATE SET
-        d.list_name                = s.list_name,
-        d.entity_name              = s.entity_name,
-        d.risk_level               = s.risk_level
-    WHEN NOT MATCHED THEN INSERT (
-        sanction_id, list_name, entity_name, risk_level
-    ) VALUES (
-        s.sanction_id, s.list_name, s.entity_name, s.risk_level
-    )
-    """
-    cur.executemany(sql_insert_query,rows)
-    print("Data loaded successfully into Oracle!")
-
-
-def main():
+    return _run_spec("STG_SANCTIONS", engine, cur)
+
+
+STAGES = [
+    ("stg_customer", stg_customer),
+    ("stg_account", stg_account),
+    ("stg_merchant", stg_merchant),
+    ("stg_branches", stg_branches),
+    ("stg_geo", stg_geo),
+    ("stg_txn", stg_txn),
+    ("stg_logins", stg_logins),
+    ("stg_devices", stg_devices),
+    ("stg_sanction", stg_sanction),
+]
+
+def main(force=None, new_run=False):
+    from run_manifest import RunManifest
+    manifest = RunManifest("clean", force=force, new_run=new_run)
     engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
     with oracledb.connect(user=USER, password=PWD, dsn=DSN) as conn:
         cur = conn.cursor()
-        stg_customer(engine,cur)
-        stg_account(engine,cur)
-        stg_merchant(engine,cur)
-        stg_branches(engine,cur)
-        stg_geo(engine,cur)
-        stg_txn(engine,cur)
-        stg_logins(engine,cur)
-        stg_devices(engine,cur)
-        stg_sanction(engine,cur)
-        conn.commit()
+        # commit per stage so a later failure does not roll back finished tables
+        for name, fn in STAGES:
+            manifest.run(name, fn, engine, cur, commit=conn.commit)
+    manifest.finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""
+DEVICE / FINGERPRINT LINKAGE
+Customers, devices, fingerprints (and optionally geos) are nodes; every login
+links customer <-> device (<-> geo) and every device links to its fingerprint.
+Connected components are kept as labelled node sets and updated as logins
+stream in, so `lookup(customer_id)` is cheap enough to call inline from the
+scorer.
+
+A device used by more than LINK_MAX_DEVICE_CUSTOMERS customers, or a
+fingerprint shared by more than LINK_MAX_FINGERPRINT_DEVICES devices, is a
+hub (a kiosk, a branch tablet, a stock browser build): its customers are
+flagged HUB_DEVICE but it no longer links them. Labels (rather than a
+union-find) are what let a component be split when a node turns into a hub
+mid-stream; see `_make_hub`.
+"""
+import os
+from collections import deque
+
+SHARED_DEVICE_MIN = int(os.getenv("LINK_SHARED_DEVICE_MIN", "3"))  # customers on one device
+RING_MIN_CUSTOMERS = int(os.getenv("LINK_RING_MIN", "5"))          # customers in one component
+LINK_GEO = os.getenv("LINK_GEO", "0") == "1"                       # shared IPs are noisy; off by default
+# past these a device / fingerprint is a hub and stops merging components
+MAX_DEVICE_CUSTOMERS = int(os.getenv("LINK_MAX_DEVICE_CUSTOMERS", "4"))
+MAX_FINGERPRINT_DEVICES = int(os.getenv("LINK_MAX_FINGERPRINT_DEVICES", "4"))
+
+CUSTOMER, DEVICE, FINGERPRINT, GEO = "C", "D", "F", "G"
+
+
+def _field(rec, name):
+    # STG tables come back lowercase from pandas, CDC payloads are uppercase
+    v = rec.get(name, rec.get(name.upper()))
+    if v is None:
+        return None
+    v = str(v).strip().upper()
+    return v or None
+
+
+class LinkageGraph:
+
+    def __init__(self):
+        self.ids = {}               # (kind, key) -> node id
+        self.kinds = []             # per node
+        self.comp = []              # per node; component label
+        self.members = {}           # label -> set of nodes
+        self.n_customers = {}       # label -> customers in the component
+        self.n_devices = {}
+        self.next_label = 0
+        self.edges = []             # per node; [(other node, hub candidate or None)]
+        self.hubs = set()           # device / fingerprint nodes that no longer link
+        self.device_customers = {}  # device node -> set of customer ids
+        self.customer_devices = {}  # customer id -> set of device nodes
+        self.fingerprint_devices = {}
+        self.fingerprint_shared = set()  # device nodes whose fingerprint is on >1 device
+
+    def _node(self, kind, key):
+        nid = self.ids.get((kind, key))
+        if nid is None:
+            nid = len(self.kinds)
+            self.ids[(kind, key)] = nid
+            self.kinds.append(kind)
+            self.edges.append([])
+            self.comp.append(None)
+            self._label([nid])
+        return nid
+
+    def _label(self, nodes):
+        """Give `nodes` a fresh component label of their own."""
+        label = self.next_label
+        self.next_label += 1
+        for x in nodes:
+            self.comp[x] = label
+        self.members[label] = set(nodes)
+        self.n_customers[label] = sum(self.kinds[x] == CUSTOMER for x in nodes)
+        self.n_devices[label] = sum(self.kinds[x] == DEVICE for x in nodes)
+        return label
+
+    def _union(self, a, b):
+        # relabel the smaller side, so a node moves O(log n) times over all merges
+        la, lb = self.comp[a], self.comp[b]
+        if la == lb:
+            return
+        if len(self.members[la]) < len(self.members[lb]):
+            la, lb = lb, la
+        moved = self.members.pop(lb)
+        for x in moved:
+            self.comp[x] = la
+        self.members[la] |= moved
+        self.n_customers[la] += self.n_customers.pop(lb)
+        self.n_devices[la] += self.n_devices.pop(lb)
+
+    def _link(self, a, b, via=None):
+        """Record the edge a-b; it merges components unless `via` is (or becomes) a hub."""
+        self.edges[a].append((b, via))
+        self.edges[b].append((a, via))
+        if via not in self.hubs:
+            self._union(a, b)
+
+    def _make_hub(self, hub):
+        """Stop linking through `hub` and split off the pieces its edges held on.
+
+        Searches start at the hub and at every node it linked, one step each in
+        turn; a search that reaches another's node joins it (and hands over its
+        frontier). Once a single search is left running, every search that ran
+        dry has found a whole piece that broke away. Only those are relabelled,
+        so the cost is the size of the pieces that split off, not of the
+        component they came from.
+        """
+        self.hubs.add(hub)
+        hubs, edges = self.hubs, self.edges
+        starts = list(dict.fromkeys([hub] + [y for y, via in edges[hub] if via == hub]))
+        owner = {x: i for i, x in enumerate(starts)}
+        joined = list(range(len(starts)))        # search -> search it joined
+        seen = [[x] for x in starts]
+        frontier = [deque([x]) for x in starts]
+        running = list(range(len(starts)))
+        dry = []
+
+        def group(i):
+            while joined[i] != i:
+                i = joined[i]
+            return i
+
+        while len(running) > 1:
+            for i in list(running):
+                if len(running) <= 1:
+                    break
+                if i not in running:
+                    continue
+                if not frontier[i]:
+                    running.remove(i)
+                    dry.append(i)
+                    continue
+                x = frontier[i].popleft()
+                for y, via in edges[x]:
+                    if via in hubs:
+                        continue
+                    j = owner.get(y)
+                    if j is None:
+                        owner[y] = i
+                        seen[i].append(y)
+                        frontier[i].append(y)
+                    elif group(j) != i:
+                        g = group(j)
+                        joined[i] = g
+                        frontier[i].append(x)       # x's other edges are still unexplored
+                        frontier[g].extend(frontier[i])
+                        frontier[i] = deque()
+                        running.remove(i)
+                        break
+
+        label = self.comp[hub]
+        for i in dry:
+            piece = [x for s in range(len(starts)) if group(s) == i for x in seen[s]]
+            self.members[label].difference_update(piece)
+            self.n_customers[label] -= sum(self.kinds[x] == CUSTOMER for x in piece)
+            self.n_devices[label] -= sum(self.kinds[x] == DEVICE for x in piece)
+            self._label(piece)
+
+    def add_hubs(self, kind, keys):
+        """Mark hubs known up front, so a batch load never has to split a component."""
+        for key in keys:
+            nid = self._node(kind, key)
+            if nid not in self.hubs:
+                self._make_hub(nid)
+
+    def add_login(self, customer_id, device_id, geo_id=None):
+        if not customer_id or not device_id:
+            return
+        c = self._node(CUSTOMER, customer_id)
+        d = self._node(DEVICE, device_id)
+        users = self.device_customers.setdefault(d, set())
+        if customer_id not in users:
+            users.add(customer_id)
+            self.customer_devices.setdefault(customer_id, set()).add(d)
+            if len(users) > MAX_DEVICE_CUSTOMERS and d not in self.hubs:
+                self._make_hub(d)
+            self._link(c, d, via=d)
+        if LINK_GEO and geo_id:
+            g = self._node(GEO, geo_id)
+            if not any(y == g for y, _ in self.edges[d]):
+                self._link(d, g)
+
+    def add_device(self, device_id, fingerprint):
+        if not device_id or not fingerprint:
+            return
+        d = self._node(DEVICE, device_id)
+        f = self._node(FINGERPRINT, fingerprint)
+        devices = self.fingerprint_devices.setdefault(f, set())
+        if d in devices:
+            return
+        devices.add(d)
+        if len(devices) > MAX_FINGERPRINT_DEVICES and f not in self.hubs:
+            self._make_hub(f)
+        self._link(d, f, via=f)
+        if len(devices) > 1:
+            self.fingerprint_shared.update(devices)
+
+    def customer_flags(self, customer_id):
+        flags = set()
+        for d in self.customer_devices.get(customer_id, ()):
+            if d in self.hubs:
+                flags.add("HUB_DEVICE")
+            elif len(self.device_customers[d]) >= SHARED_DEVICE_MIN:
+                flags.add("SHARED_DEVICE")
+            if d in self.fingerprint_shared:
+                flags.add("SHARED_FINGERPRINT")
+        return flags
+
+    def apply(self, table, rec):
+        """Apply one staged row or unwrapped Debezium record."""
+        table = table.upper().rsplit(".", 1)[-1]
+        if table.endswith("LOGINS"):
+            self.add_login(_field(rec, "customer_id"), _field(rec, "device_id"), _field(rec, "geo_id"))
+        elif table.endswith("DEVICES"):
+            self.add_device(_field(rec, "device_id"), _field(rec, "fingerprint"))
+
+    def lookup(self, customer_id):
+        customer_id = str(customer_id).strip().upper()
+        nid = self.ids.get((CUSTOMER, customer_id))
+        if nid is None:
+            return {"component_size": 1, "customers": 1, "devices": 0, "flags": []}
+        label = self.comp[nid]
+        flags = self.customer_flags(customer_id)
+        if self.n_customers[label] >= RING_MIN_CUSTOMERS:
+            flags.add("LARGE_RING")
+        return {
+            "component_size": len(self.members[label]),
+            "customers": self.n_customers[label],
+            "devices": self.n_devices[label],
+            "flags": sorted(flags),
+        }
+
+    def components(self):
+        """(label, customers, devices) for every component with a customer."""
+        for label, customers in self.n_customers.items():
+            if customers:
+                yield label, customers, self.n_devices[label]
+
+
+def load_from_oracle(engine):
+    import pandas as pd
+    graph = LinkageGraph()
+    devices = pd.read_sql_query("SELECT device_id, fingerprint FROM STG_DEVICES", engine)
+    logins = pd.read_sql_query("SELECT customer_id, device_id, geo_id FROM STG_LOGINS", engine)
+    graph.add_hubs(FINGERPRINT, _over(devices, "fingerprint", "device_id", MAX_FINGERPRINT_DEVICES))
+    graph.add_hubs(DEVICE, _over(logins, "device_id", "customer_id", MAX_DEVICE_CUSTOMERS))
+    for rec in devices.to_dict("records"):
+        graph.apply("STG_DEVICES", rec)
+    for rec in logins.to_dict("records"):
+        graph.apply("STG_LOGINS", rec)
+    return graph
+
+
+def _over(df, node_col, other_col, cap):
+    """Keys of `node_col` seen with more than `cap` distinct `other_col` values."""
+    norm = lambda s: s.astype("string").str.strip().str.upper()
+    counts = norm(df[other_col]).groupby(norm(df[node_col])).nunique()
+    return counts.index[counts > cap]
+
+
+def main():
+    import sqlalchemy
+    from dataCleaning import USER, pwd_enc, dsn_enc
+    engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+    graph = load_from_oracle(engine)
+    comps = sorted(graph.components(), key=lambda c: c[1], reverse=True)
+    print(f"[LINK] {len(graph.ids)} nodes, {len(comps)} customer components")
+    for root, customers, devices in comps[:10]:
+        print(f"  component {root}: {customers} customers, {devices} devices")
+    flagged = sum(1 for c in graph.customer_devices if graph.customer_flags(c) - {"HUB_DEVICE"})
+    print(f"[LINK] {len(graph.hubs)} hub devices/fingerprints not linked, "
+          f"{flagged} customers carry a shared-device/fingerprint flag")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+ENTITY RESOLUTION FOR STG_CUSTOMER
+Finds the same person under different customer_ids using blocking keys
+(phone, email local part, name + dob sorted neighbourhood), scores candidate
+pairs with vectorized comparisons and clusters matches with union-find.
+Result is written to STG_CUSTOMER_ENTITY (customer_id -> entity_id).
+"""
+import os, re, oracledb, pandas as pd, numpy as np, sqlalchemy
+
+from dataCleaning import USER, PWD, DSN, pwd_enc, dsn_enc, normalize_rows
+from table_specs import SPECS, ensure_table, merge_rows
+from union_find import UnionFind
+
+MATCH_THRESHOLD = float(os.getenv("ER_THRESHOLD", "0.6"))
+WINDOW = int(os.getenv("ER_WINDOW", "5"))            # sorted-neighbourhood window
+MAX_BLOCK = int(os.getenv("ER_MAX_BLOCK", "50"))     # skip junk keys shared by huge groups
+
+# weight per agreeing field; a pair matches when the sum reaches MATCH_THRESHOLD
+WEIGHTS = {
+    "name_key": 0.25,
+    "last_name": 0.05,
+    "dob": 0.30,
+    "phone": 0.35,
+    "email_local": 0.15,
+    "address": 0.25,
+    "zip": 0.05,
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+
+def _name_key(s):
+    if s is None or pd.isna(s): return None
+    tokens = _NON_ALNUM.sub(" ", str(s).lower()).split()
+    return " ".join(sorted(tokens)) if tokens else None
+
+def _last_name(s):
+    if s is None or pd.isna(s): return None
+    tokens = _NON_ALNUM.sub(" ", str(s).lower()).split()
+    return tokens[-1] if tokens else None
+
+def _email_local(e):
+    if e is None or pd.isna(e) or "@" not in str(e): return None
+    local = str(e).strip().lower().split("@", 1)[0]
+    local = local.split("+", 1)[0].replace(".", "")
+    return local or None
+
+def _phone_key(p):
+    if p is None or pd.isna(p): return None
+    digits = "".join(filter(str.isdigit, str(p)))
+    return digits[-10:] if len(digits) >= 10 else None
+
+def _address_key(a):
+    if a is None or pd.isna(a): return None
+    # street part only; city/state are too coarse to block or score on
+    street = str(a).split(",", 1)[0]
+    return " ".join(_NON_ALNUM.sub(" ", street.lower()).split()) or None
+
+
+def build_features(df):
+    """Normalised comparison columns, one row per customer_id, index 0..n-1."""
+    out = pd.DataFrame({"customer_id": df["customer_id"].astype(str).str.strip().str.upper()})
+    out["name_key"] = df["name"].map(_name_key)
+    out["last_name"] = df["name"].map(_last_name)
+    out["dob"] = pd.to_datetime(df["dob"], errors="coerce").dt.strftime("%Y-%m-%d")
+    out["phone"] = df["phone"].map(_phone_key)
+    out["email_local"] = df["email"].map(_email_local)
+    out["address"] = df["address"].map(_address_key)
+    out["zip"] = df["zip"].map(lambda z: str(z).strip()[:5] if pd.notna(z) else None) if "zip" in df else None
+    out = out.astype(object).where(out.notna(), None)
+    return out.reset_index(drop=True)
+
+
+def _window_pairs(order, window, keys=None):
+    """Pairs (order[i], order[i+k]) for k < window; if keys are given only
+    neighbours with an equal key are kept (exact blocking on a sorted key)."""
+    left, right = [], []
+    for k in range(1, window):
+        if k >= len(order):
+            break
+        a, b = order[:-k], order[k:]
+        if keys is not None:
+            same = keys[:-k] == keys[k:]
+            a, b = a[same], b[same]
+        left.append(a)
+        right.append(b)
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def exact_block_pairs(feat, col):
+    key = feat[col]
+    sizes = key.map(key.value_counts())
+    sub = key[key.notna() & sizes.between(2, MAX_BLOCK)].sort_values(kind="stable")
+    order = sub.index.to_numpy(dtype=np.int64)
+    return _window_pairs(order, MAX_BLOCK, sub.to_numpy())
+
+
+def sorted_neighbourhood_pairs(feat):
+    key = (feat["dob"].fillna("") + "|" + feat["name_key"].fillna("")).where(
+        feat["dob"].notna() | feat["name_key"].notna())
+    sub = key.dropna().sort_values(kind="stable")
+    return _window_pairs(sub.index.to_numpy(dtype=np.int64), WINDOW)
+
+
+def candidate_pairs(feat):
+    blocks = [exact_block_pairs(feat, "phone"),
+              exact_block_pairs(feat, "email_local"),
+              sorted_neighbourhood_pairs(feat)]
+    left = np.concatenate([b[0] for b in blocks])
+    right = np.concatenate([b[1] for b in blocks])
+    lo, hi = np.minimum(left, right), np.maximum(left, right)
+    keep = lo != hi
+    codes = np.unique(lo[keep] * len(feat) + hi[keep])
+    return codes // len(feat), codes % len(feat)
+
+
+def score_pairs(feat, left, right):
+    score = np.zeros(len(left))
+    for col, weight in WEIGHTS.items():
+        vals = feat[col].to_numpy(dtype=object)
+        a, b = vals[left], vals[right]
+        agree = (a == b) & pd.notna(a) & pd.notna(b)
+        score += weight * agree
+    return score
+
+
+def resolve(df):
+    """Returns customer_id, entity_id, cluster_size for every input customer."""
+    feat = build_features(df)
+    n = len(feat)
+    left, right = candidate_pairs(feat)
+    score = score_pairs(feat, left, right)
+    matched = score >= MATCH_THRESHOLD
+    print(f"[ER] {n} customers, {len(left)} candidate pairs, {int(matched.sum())} matches")
+
+    uf = UnionFind(n)
+    uf.union_many(left[matched], right[matched])
+    roots = np.fromiter(uf.labels(), dtype=np.int64, count=n)
+
+    out = feat[["customer_id"]].copy()
+    out["root"] = roots
+    # smallest customer_id in the cluster is the stable entity id
+    out["entity_id"] = out.groupby("root")["customer_id"].transform("min")
+    out["cluster_size"] = out.groupby("root")["customer_id"].transform("size")
+    return out.drop(columns="root")
+
+
+def write_entities(cur, out):
+    spec = SPECS["STG_CUSTOMER_ENTITY"]
+    ensure_table(cur, spec)
+    rows = normalize_rows(out.astype({"cluster_size": int}).to_dict(orient="records"))
+    merge_rows(cur, spec, rows)
+    print(f"Resolved {out['entity_id'].nunique()} entities from {len(out)} customers")
+
+
+def main():
+    engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+    df = pd.read_sql_query(
+        "SELECT customer_id, name, dob, email, phone, address, zip FROM STG_CUSTOMER", engine)
+    df.columns = [str(c).lower() for c in df.columns]
+    out = resolve(df)
+    with oracledb.connect(user=USER, password=PWD, dsn=DSN) as conn:
+        cur = conn.cursor()
+        write_entities(cur, out)
+        conn.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+PIPELINE CLI
+Single entry point for the batch and CDC jobs:
+
+    python scripts/pipeline.py raw | staging | clean | cdc-check | scan | resolve | linkage | replay | state | decode-bench | score | profile
+    python scripts/pipeline.py archive export | query --entity A-3280
+    python scripts/pipeline.py risk build | run | top
+    python scripts/pipeline.py status       # last run manifest of raw / clean
+    python scripts/pipeline.py startup      # import-time budget check
+
+Only the standard library is imported up front. Each subcommand imports its
+job module (and with it pandas / SQLAlchemy / oracledb / confluent_kafka)
+inside its handler, so quick runs such as `cdc-check` do not pay for pandas.
+"""
+import os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+STARTUP_BUDGET_MS = float(os.getenv("PIPELINE_STARTUP_BUDGET_MS", "50"))
+
+
+def _run(module, func="main"):
+    def handler(args):
+        mod = __import__(module)
+        # everything the subcommand's own arguments added is passed through as kwargs
+        kwargs = {k: v for k, v in vars(args).items() if k not in ("command", "handler")}
+        if args.command in RESUMABLE and kwargs["force"] == []:
+            kwargs["force"] = ["all"]
+        rc = getattr(mod, func)(**kwargs)
+        return rc if isinstance(rc, int) else 0
+    return handler
+
+
+# name -> (job module, help); "quick" ones are held to the startup budget
+COMMANDS = {
+    "raw":       ("raw_load",          "land the raw CSVs into RAW_* tables"),
+    "staging":   ("staging_load",      "load the old CSVs into stg_* landing tables"),
+    "clean":     ("dataCleaning",      "clean RAW_* into STG_* (MERGE)"),
+    "cdc-check": ("check_cdc",         "check CDC topics exist and sample one message each"),
+    "scan":      ("aml_scan",          "batch AML scan of STG_TRANSACTIONS into ALERTS"),
+    "resolve":   ("entity_resolution", "entity resolution over STG_CUSTOMER"),
+    "linkage":   ("device_linkage",    "device / fingerprint linkage summary"),
+    "replay":    ("replay",            "replay transactions + logins and measure latency"),
+    "state":     ("state_store",       "materialize CDC topics into the local state store"),
+    "decode-bench": ("cdc_decode",     "benchmark batch CDC decoding against per-message json.loads"),
+    "score":     ("scoring_workers",   "run partition-aware scoring workers (one per core)"),
+    "profile":   ("profiler",          "single-pass data-quality profile of the raw CSVs or RAW_* tables"),
+    "archive":   ("archive",           "export transactions / logins to date-partitioned Parquet, or query it"),
+    "risk":      ("risk_scores",       "time-decayed customer / account risk scores from alerts, top-K"),
+}
+# jobs that keep a run manifest (see run_manifest.py) and can resume
+RESUMABLE = {"raw", "clean"}
+
+# quick subcommand -> import budget in ms; confluent_kafka alone is ~70 ms of cdc-check
+QUICK = {"cdc-check": float(os.getenv("PIPELINE_CDC_BUDGET_MS", "120"))}
+
+
+def import_time_ms(stmt):
+    """Cumulative import time of `stmt` in a fresh interpreter, from -X importtime."""
+    import subprocess
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else stmt)
+    total_us, modules = 0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = line[len("import time:"):].split("|")
+        # nested imports are indented under their parent; only top-level ones add up
+        if len(name) - len(name.lstrip(" ")) == 1:
+            total_us += int(cum_us)
+            modules.append((int(cum_us), name.strip()))
+    return total_us / 1000, sorted(modules, reverse=True)[:5]
+
+
+def startup(args):
+    checks = [("pipeline", "import pipeline; pipeline.build_parser()")]
+    checks += [(name, f"import {COMMANDS[name][0]}") for name in sorted(QUICK)]
+    if args.all:
+        checks += [(name, f"import {mod}") for name, (mod, _) in COMMANDS.items() if name not in QUICK]
+    over = []
+    for name, stmt in checks:
+        try:
+            ms, top = import_time_ms(stmt)
+        except RuntimeError as e:
+            print(f"[STARTUP] {name}: import failed ({e})")
+            over.append(name)
+            continue
+        budget = STARTUP_BUDGET_MS if name == "pipeline" else QUICK.get(name)
+        status = "ok" if budget is None or ms <= budget else "OVER BUDGET"
+        print(f"[STARTUP] {name:<10} {ms:8.1f} ms  {status}" + (f" (budget {budget:.0f} ms)" if budget else ""))
+        if status != "ok":
+            over.append(name)
+            for cum_us, mod in top:
+                print(f"             {cum_us/1000:8.1f} ms  {mod}")
+    return 1 if over else 0
+
+
+def status(args):
+    from run_manifest import summary
+    for job in [args.job] if args.job else sorted(RESUMABLE):
+        print(summary(job))
+    return 0
+
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="pipeline", description="Fraud/AML pipeline jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (module, help_text) in COMMANDS.items():
+        p = sub.add_parser(name, help=help_text)
+        p.set_defaults(handler=_run(module))
+        if name in RESUMABLE:
+            p.add_argument("--force", nargs="*", metavar="STAGE",
+                           help="re-run completed stages (all of them when no STAGE is given)")
+            p.add_argument("--new-run", action="store_true", help="ignore an unfinished run and start over")
+        if name == "profile":
+            p.add_argument("--source", choices=["csv", "raw"], default="csv",
+                           help="profile the CSVs in DATA_DIR or the RAW_* tables in Oracle")
+            p.add_argument("tables", nargs="*", help="tables to profile (default: all)")
+        if name == "decode-bench":
+            p.add_argument("-n", type=int, help="benchmark only the first N replayed events (default: all)")
+        if name == "archive":
+            p.add_argument("action", choices=["export", "query"])
+            p.add_argument("--table", choices=["transactions", "logins"], help="default: both")
+            p.add_argument("--entity", help="account id (transactions) or customer id (logins) to query")
+            p.add_argument("--start", help="first date, YYYY-MM-DD")
+            p.add_argument("--end", help="last date, YYYY-MM-DD (inclusive)")
+            p.add_argument("--full", action="store_true", help="drop the archive and re-export everything")
+        if name == "risk":
+            p.add_argument("action", choices=["build", "run", "top"], nargs="?", default="top",
+                           help="rebuild from ALERTS, follow the alert topics, or show the riskiest entities")
+            p.add_argument("--csv", help="build from an alerts CSV instead of the ALERTS table")
+            p.add_argument("--accounts-csv", help="accounts CSV for the account -> customer map (with --csv)")
+            p.add_argument("--type", dest="entity_type", choices=["CUSTOMER", "ACCOUNT"], default="CUSTOMER")
+            p.add_argument("-k", type=int, default=10, help="how many entities to show")
+    p = sub.add_parser("status", help="show the last run manifest of the resumable jobs")
+    p.add_argument("job", nargs="?", choices=sorted(RESUMABLE))
+    p.set_defaults(handler=status)
+    p = sub.add_parser("startup", help="measure import time against the startup budget")
+    p.add_argument("--all", action="store_true", help="also report the heavy subcommands")
+    p.set_defaults(handler=startup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
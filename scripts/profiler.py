@@ -0,0 +1,308 @@
+"""
+RAW DATA-QUALITY PROFILER
+One pass over each RAW table (or raw CSV) in chunks, constant memory per
+column regardless of table size:
+    null / blank rate
+    distinct count (HyperLogLog)
+    date formats seen (for date-like columns)
+    value length histogram and values too long for the target STG column
+    duplicate-key rate (exact within a chunk, Bloom filter across chunks)
+Each run writes reports/profile/<table>-<run>.json and prints what changed
+against the previous report for the same table.
+"""
+import os, re, sys, json, glob, math
+from datetime import datetime, timezone
+import numpy as np, pandas as pd
+
+from table_specs import SPECS
+
+REPORT_DIR = os.getenv("PROFILE_REPORT_DIR",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reports", "profile"))
+CHUNK_ROWS = int(os.getenv("PROFILE_CHUNK_ROWS", "100000"))
+HLL_P = int(os.getenv("PROFILE_HLL_P", "12"))          # 4096 registers, ~1.6% error
+KEY_HLL_P = int(os.getenv("PROFILE_KEY_HLL_P", "14"))  # keys get 16384 registers, ~0.8%
+# key duplicates are counted exactly within a chunk and through a Bloom filter across
+# chunks: 2^27 bits (16 MB), 7 hashes -> ~0.2% false "duplicates" at 10M distinct keys
+BLOOM_BITS = int(os.getenv("PROFILE_BLOOM_BITS", str(1 << 27)))
+BLOOM_K = int(os.getenv("PROFILE_BLOOM_K", "7"))
+DUP_RATE_ALERT = float(os.getenv("PROFILE_DUP_RATE_ALERT", "0.005"))
+
+# key column, STG target widths (VARCHAR2 length / NUMBER digits) and the columns clean
+# reads, per RAW table; taken from the STG specs so the profiler checks what clean will create
+TABLES = {spec.source[len("RAW_"):].lower(): (spec.key, {c.name: c.width for c in spec.columns if c.width},
+                                              spec.source_columns)
+          for spec in SPECS.values() if spec.source and spec.name.startswith("STG_")}
+META_COLS = {"ingest_ts", "source_file", "rownum_in_file"}
+
+DATE_FORMATS = [
+    ("YYYY-MM-DD", re.compile(r"^\d{4}-\d{2}-\d{2}$")),
+    ("YYYY-MM-DDTHH:MM:SS", re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(:\d{2})?$")),
+    ("YYYY-MM-DD HH:MM:SS", re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$")),
+    ("MM/DD/YYYY", re.compile(r"^\d{1,2}/\d{1,2}/\d{4}$")),
+    ("MM/DD/YYYY HH:MM", re.compile(r"^\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}(:\d{2})?$")),
+]
+LEN_EDGES = np.array([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096])
+LEN_LABELS = ["0"] + [f"{lo}-{hi - 1}" for lo, hi in zip(LEN_EDGES[:-1], LEN_EDGES[1:])] + [f"{LEN_EDGES[-1]}+"]
+
+
+def _is_date_column(name):
+    return name in ("dob", "ts") or name.endswith("_at") or name.endswith("_ts")
+
+
+class HyperLogLog:
+
+    def __init__(self, p=HLL_P):
+        self.p = p
+        self.m = 1 << p
+        self.reg = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, h):
+        h = np.asarray(h, dtype=np.uint64)
+        if not len(h):
+            return
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        x = h << np.uint64(self.p)
+        # vectorized count of leading zeros in the remaining 64-p bits
+        nlz = np.zeros(len(x), dtype=np.uint8)
+        for s in (32, 16, 8, 4, 2, 1):
+            top_zero = x <= np.uint64((1 << (64 - s)) - 1)
+            nlz[top_zero] += s
+            x[top_zero] <<= np.uint64(s)
+        rho = np.minimum(nlz + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.reg, idx, rho)
+
+    def add(self, series):
+        self.add_hashes(pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy())
+
+    def merge(self, other):
+        np.maximum(self.reg, other.reg, out=self.reg)
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        e = alpha * m * m / np.sum(np.ldexp(1.0, -self.reg.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.reg == 0))
+        if e <= 2.5 * m and zeros:
+            e = m * math.log(m / zeros)
+        return int(round(e))
+
+
+class BloomFilter:
+    """Bit-packed Bloom filter over uint64 hash pairs (double hashing), vectorized."""
+
+    def __init__(self, bits=BLOOM_BITS, k=BLOOM_K):
+        self.m = np.uint64(bits)
+        self.k = k
+        self.bits = np.zeros((bits + 7) // 8, dtype=np.uint8)
+
+    def check_and_add(self, h1, h2):
+        """Which of the (distinct) keys were possibly seen before; then add them all."""
+        i = np.arange(self.k, dtype=np.uint64)
+        with np.errstate(over="ignore"):           # uint64 wrap-around is the intent
+            pos = (h1[:, None] + i[None, :] * (h2[:, None] | np.uint64(1))) % self.m
+        byte = (pos >> np.uint64(3)).astype(np.int64)
+        bit = np.left_shift(np.uint8(1), (pos & np.uint64(7)).astype(np.uint8))
+        seen = ((self.bits[byte] & bit) != 0).all(axis=1)
+        np.bitwise_or.at(self.bits, byte.ravel(), bit.ravel())
+        return seen
+
+
+class KeyDuplicates:
+    """Duplicate key count: exact within each chunk, Bloom filter across chunks."""
+
+    def __init__(self):
+        self.bloom = BloomFilter()
+        self.non_null = 0
+        self.dups = 0
+
+    def update(self, col):
+        s = col.astype("string").str.strip()
+        vals = s[s.notna() & (s != "")]
+        self.non_null += len(vals)
+        uniq = vals.drop_duplicates()
+        self.dups += len(vals) - len(uniq)
+        if len(uniq):
+            h1 = pd.util.hash_pandas_object(uniq, index=False).to_numpy()
+            h2 = pd.util.hash_pandas_object(uniq, index=False, hash_key="profiler-bloom-2").to_numpy()
+            self.dups += int(self.bloom.check_and_add(h1, h2).sum())
+
+    def report(self, column):
+        return {"column": column, "non_null": self.non_null, "duplicates": self.dups,
+                "dup_rate": round(self.dups / self.non_null, 6) if self.non_null else None}
+
+
+class ColumnProfile:
+
+    def __init__(self, name, width=None, p=HLL_P):
+        self.name = name
+        self.width = width
+        self.rows = 0
+        self.nulls = 0
+        self.max_len = 0
+        self.over_width = 0
+        self.len_hist = np.zeros(len(LEN_LABELS), dtype=np.int64)
+        self.hll = HyperLogLog(p)
+        self.date_formats = {} if _is_date_column(name) else None
+
+    def update(self, col):
+        self.rows += len(col)
+        s = col.astype("string").str.strip()
+        present = s.notna() & (s != "")
+        self.nulls += int((~present).sum())
+        vals = s[present]
+        if vals.empty:
+            return
+        self.hll.add(vals)
+        lengths = vals.str.len().to_numpy(dtype=np.int64)
+        self.max_len = max(self.max_len, int(lengths.max()))
+        self.len_hist += np.bincount(np.searchsorted(LEN_EDGES, lengths, side="right"),
+                                     minlength=len(LEN_LABELS))[:len(LEN_LABELS)]
+        if self.width:
+            self.over_width += int((lengths > self.width).sum())
+        if self.date_formats is not None:
+            unmatched = pd.Series(True, index=vals.index)
+            for label, rx in DATE_FORMATS:
+                hit = unmatched & vals.str.match(rx)
+                if hit.any():
+                    self.date_formats[label] = self.date_formats.get(label, 0) + int(hit.sum())
+                    unmatched &= ~hit
+            if unmatched.any():
+                self.date_formats["other"] = self.date_formats.get("other", 0) + int(unmatched.sum())
+
+    def report(self):
+        out = {
+            "null_rate": round(self.nulls / self.rows, 6) if self.rows else None,
+            "distinct_est": self.hll.estimate(),
+            "max_len": self.max_len,
+            "len_hist": {k: int(v) for k, v in zip(LEN_LABELS, self.len_hist) if v},
+        }
+        if self.width:
+            out.update(target_width=self.width, over_width=self.over_width)
+        if self.date_formats is not None:
+            out["date_formats"] = self.date_formats
+        return out
+
+
+def profile_chunks(table, chunks):
+    key, widths, stg_cols = TABLES[table]
+    cols, rows, key_dups = {}, 0, KeyDuplicates()
+    for chunk in chunks:
+        chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+        rows += len(chunk)
+        for c in chunk.columns:
+            if c in META_COLS:
+                continue
+            if c not in cols:
+                cols[c] = ColumnProfile(c, widths.get(c), KEY_HLL_P if c == key else HLL_P)
+            cols[c].update(chunk[c])
+        if key in chunk.columns:
+            key_dups.update(chunk[key])
+    report = {
+        "table": table,
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rows": rows,
+        "columns": {c: p.report() for c, p in cols.items()},
+        # columns STG expects but the source does not have (and vice versa)
+        "missing_columns": sorted(set(stg_cols) - set(cols)),
+        "unmapped_columns": sorted(set(cols) - set(stg_cols)),
+    }
+    if key in cols:
+        report["key"] = key_dups.report(key)
+    return report
+
+
+def csv_chunks(path):
+    return pd.read_csv(path, dtype=str, chunksize=CHUNK_ROWS, encoding_errors="ignore")
+
+
+def raw_chunks(engine, table):
+    return pd.read_sql_query(f"SELECT * FROM RAW_{table.upper()}", engine, chunksize=CHUNK_ROWS)
+
+
+def previous_report(table):
+    runs = sorted(glob.glob(os.path.join(REPORT_DIR, f"{table}-*.json")))
+    if not runs:
+        return None
+    with open(runs[-1]) as f:
+        return json.load(f)
+
+
+def compare(prev, cur):
+    """Human-readable changes worth a look since the previous run."""
+    notes = []
+    if prev["rows"] != cur["rows"]:
+        notes.append(f"rows {prev['rows']} -> {cur['rows']}")
+    for c, now in cur["columns"].items():
+        before = prev["columns"].get(c)
+        if before is None:
+            notes.append(f"{c}: new column")
+            continue
+        if now["null_rate"] is not None and before["null_rate"] is not None \
+                and abs(now["null_rate"] - before["null_rate"]) >= 0.01:
+            notes.append(f"{c}: null rate {before['null_rate']:.2%} -> {now['null_rate']:.2%}")
+        if before["distinct_est"] and abs(now["distinct_est"] / before["distinct_est"] - 1) >= 0.10:
+            notes.append(f"{c}: distinct {before['distinct_est']} -> {now['distinct_est']}")
+        if now.get("over_width", 0) > before.get("over_width", 0):
+            notes.append(f"{c}: {now['over_width']} values over width {now['target_width']} (was {before.get('over_width', 0)})")
+        new_formats = set(now.get("date_formats") or {}) - set(before.get("date_formats") or {})
+        if new_formats:
+            notes.append(f"{c}: new date formats {sorted(new_formats)}")
+    for c in set(prev["columns"]) - set(cur["columns"]):
+        notes.append(f"{c}: column disappeared")
+    pk, ck = prev.get("key") or {}, cur.get("key") or {}
+    # older reports only carry the HLL estimate, which is too coarse to compare against
+    if pk.get("dup_rate") is not None and ck.get("dup_rate") is not None \
+            and ck["dup_rate"] - pk["dup_rate"] >= DUP_RATE_ALERT:
+        notes.append(f"key {ck['column']}: dup rate {pk['dup_rate']:.2%} -> {ck['dup_rate']:.2%}")
+    return notes
+
+
+def write_report(report):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    stamp = report["run_at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    path = os.path.join(REPORT_DIR, f"{report['table']}-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def summarize(report):
+    print(f"[PROFILE] {report['table']}: {report['rows']} rows")
+    for c, r in report["columns"].items():
+        extra = ""
+        if r.get("over_width"):
+            extra += f" over_width={r['over_width']}/{r['target_width']}"
+        if r.get("date_formats") and len(r["date_formats"]) > 1:
+            extra += f" formats={r['date_formats']}"
+        print(f"  {c:<16} null={r['null_rate']:.2%} distinct~{r['distinct_est']} max_len={r['max_len']}{extra}")
+    if report.get("key"):
+        k = report["key"]
+        print(f"  key {k['column']}: {k['duplicates']} duplicates ({k['dup_rate']:.2%})")
+    if report["missing_columns"]:
+        print(f"  missing for STG: {report['missing_columns']}")
+
+
+def main(source="csv", tables=None):
+    tables = tables or list(TABLES)
+    engine = None
+    if source == "raw":
+        import sqlalchemy
+        from dataCleaning import USER, pwd_enc, dsn_enc
+        engine = sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+    else:
+        from raw_load import data_files
+        files = data_files()
+    for table in tables:
+        chunks = raw_chunks(engine, table) if engine is not None else csv_chunks(files[table])
+        report = profile_chunks(table, chunks)
+        report["source"] = f"RAW_{table.upper()}" if engine is not None else files[table]
+        prev = previous_report(table)
+        summarize(report)
+        if prev:
+            notes = compare(prev, report)
+            print("  changes since last run: " + ("; ".join(notes) if notes else "none"))
+        print(f"  report: {write_report(report)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*(sys.argv[1:2] or ["csv"]), tables=sys.argv[2:] or None))
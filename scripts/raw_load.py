@@ -8,20 +8,23 @@ PWD  = os.getenv("ORACLE_APP_PWD",  "Dr@gonfire1599")
 DSN  = '''(description= (retry_count=20)(retry_delay=3)(address=(protocol=tcps)(port=1521)(host=adb.us-chicago-1.oraclecloud.com))(connect_data=(service_name=g9e10c5aa27d741_oracletxn_high.adb.oraclecloud.com))(security=(ssl_server_dn_match=yes)))'''
 DATA_DIR = os.getenv("DATA_DIR")
 
-FILES = {
-    "customers": os.path.join(DATA_DIR,"customers_raw.csv"), 
-    "branches": os.path.join(DATA_DIR,"branches_raw.csv"), 
-    "accounts": os.path.join(DATA_DIR,"accounts_raw.csv"), 
-    "merchants": os.path.join(DATA_DIR,"merchants_raw.csv"), 
-    "devices": os.path.join(DATA_DIR,"devices_raw.csv"), 
-    "geos": os.path.join(DATA_DIR,"geos_raw.csv"), 
-    "transactions": os.path.join(DATA_DIR,"transactions_raw.csv"), 
-    "logins": os.path.join(DATA_DIR,"logins_raw.csv"), 
-    "sanctions": os.path.join(DATA_DIR,"sanctions_raw.csv"),  
-    # "alerts": os.path.join(DATA_DIR,"alerts_raw.csv"),
-}
-
-print("DATA_DIR:", DATA_DIR)
+def data_files(data_dir=None):
+    # built on demand so importing this module never needs DATA_DIR
+    data_dir = data_dir or DATA_DIR
+    if not data_dir:
+        raise SystemExit("DATA_DIR is not set (export it or add it to .env)")
+    return {
+        "customers": os.path.join(data_dir,"customers_raw.csv"), 
+        "branches": os.path.join(data_dir,"branches_raw.csv"), 
+        "accounts": os.path.join(data_dir,"accounts_raw.csv"), 
+        "merchants": os.path.join(data_dir,"merchants_raw.csv"), 
+        "devices": os.path.join(data_dir,"devices_raw.csv"), 
+        "geos": os.path.join(data_dir,"geos_raw.csv"), 
+        "transactions": os.path.join(data_dir,"transactions_raw.csv"), 
+        "logins": os.path.join(data_dir,"logins_raw.csv"), 
+        "sanctions": os.path.join(data_dir,"sanctions_raw.csv"),  
+        # "alerts": os.path.join(data_dir,"alerts_raw.csv"),
+    }
 
 def create_raw_table(cur, table_name, cols) -> None:
     meta = [
@@ -69,17 +72,25 @@ def load_file(conn, name, path):
 
     cur = conn.cursor()
     create_raw_table(cur, table_name, cols)
+    # a forced or retried stage replaces this file's earlier rows instead of appending a
+    # second copy; delete and insert commit together through the manifest (commit=...)
+    cur.execute(f'DELETE FROM {table_name} WHERE "source_file" = :f', f=path)
+    if cur.rowcount:
+        print(f"Removed {cur.rowcount} rows of an earlier load of {path}")
     insert_raw(cur, table_name, df, path)
-    conn.commit()
+    return len(df)
 
-def main():
+def main(force=None, new_run=False):
+    from run_manifest import RunManifest
     print("DATA_DIR:", DATA_DIR)
+    files = data_files()
+    manifest = RunManifest("raw", force=force, new_run=new_run)
     with oracledb.connect(user=USER, password=PWD, dsn=DSN) as conn:
-        for name, path in FILES.items():
+        for name, path in files.items():
             print(f"\n=== Loading {name} from {path} ===")
-            load_file(conn, name, path)
-        conn.commit()
+            manifest.run(f"raw_{name}", load_file, conn, name, path, commit=conn.commit)
         print("\n[OK] RAW landing complete.")
+    manifest.finish()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,321 @@
+"""
+REPLAY HARNESS
+Merges transactions_raw.csv and logins_raw.csv (or a scaled-up copy) in ts
+order and publishes them as Debezium-shaped records (ExtractNewRecordState
+with op/table/source.ts_ms, as configured in oracle-cdc.json) to Kafka or an
+in-process stand-in. A consumer on the other side decodes and scores every
+record and measures end-to-end latency; the rate is ramped step by step until
+the pipeline stops keeping up.
+"""
+import os, sys, json, time, heapq, queue, threading
+import pandas as pd
+
+from device_linkage import LinkageGraph
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "resources", "datasets"))
+TXN_FILE = os.getenv("REPLAY_TXN_FILE", os.path.join(DATA_DIR, "transactions_raw.csv"))
+LOGIN_FILE = os.getenv("REPLAY_LOGIN_FILE", os.path.join(DATA_DIR, "logins_raw.csv"))
+SCALE = int(os.getenv("REPLAY_SCALE", "1"))                 # >1 generates a larger equivalent
+SINK = os.getenv("REPLAY_SINK", "local")                    # "local" or "kafka"
+BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9094")
+TOPIC_PREFIX = os.getenv("REPLAY_TOPIC_PREFIX", "orcl.APPUSER")
+SPEEDUP = float(os.getenv("REPLAY_SPEEDUP", "0"))           # event-time speed-up; 0 = ignore event gaps
+RAMP = [int(r) for r in os.getenv("REPLAY_RAMP", "1000,2000,5000,10000,20000,50000").split(",")]
+STEP_SEC = float(os.getenv("REPLAY_STEP_SEC", "5"))
+DRAIN_SEC = float(os.getenv("REPLAY_DRAIN_SEC", "5"))
+REPORT = os.getenv("REPLAY_REPORT")
+
+THRESHOLD = float(os.getenv("AML_THRESHOLD", "10000"))
+BAND = float(os.getenv("AML_BAND", "0.10"))
+
+# saturated once the consumer falls this far behind the offered rate,
+# or the p99 grows this many times over the first step
+SAT_RATIO = 0.9
+SAT_P99_GROWTH = 5.0
+
+SOURCES = {
+    "TRANSACTIONS": ("txn_id", TXN_FILE),
+    "LOGINS": ("login_id", LOGIN_FILE),
+}
+
+
+def _scale_up(df, id_col, scale):
+    if scale <= 1:
+        return df
+    span = df["__ts"].max() - df["__ts"].min() + pd.Timedelta(days=1)
+    copies = [df]
+    for k in range(1, scale):
+        c = df.copy()
+        c[id_col] = c[id_col] + f"-R{k}"
+        c["__ts"] = c["__ts"] + span * k
+        # the published ts moves with the copy, so event time stays in send order
+        c["ts"] = c["__ts"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+        copies.append(c)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _events(table, id_col, df):
+    cols = [c for c in df.columns if c != "__ts"]
+    ts_ns = df["__ts"].astype("datetime64[ns]").astype("int64").to_numpy()   # pandas 3 parses to us
+    for ts, row in zip(ts_ns, df[cols].itertuples(index=False, name=None)):
+        value = {c.upper(): v for c, v in zip(cols, row)}
+        yield int(ts), table, {id_col.upper(): value[id_col.upper()]}, value
+
+
+def load_events(scale=SCALE):
+    """Generator of (ts_ns, table, key, value) merged across sources in ts order."""
+    streams = []
+    for table, (id_col, path) in SOURCES.items():
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df["__ts"] = pd.to_datetime(df["ts"].str.strip(), errors="coerce", format="mixed")
+        df = df.dropna(subset=["__ts"]).sort_values("__ts", kind="stable")
+        df = _scale_up(df, id_col, scale)
+        print(f"[REPLAY] {table}: {len(df)} events from {path}")
+        streams.append(_events(table, id_col, df))
+    return Pushback(heapq.merge(*streams, key=lambda e: e[0]))
+
+
+class Pushback:
+    """Iterator that takes back the one event a ramp step pulled but did not send."""
+
+    def __init__(self, it):
+        self.it = iter(it)
+        self.held = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.held.pop() if self.held else next(self.it)
+
+    def push(self, ev):
+        self.held.append(ev)
+
+
+def paced(events, rate, seconds, speedup=SPEEDUP):
+    """Yield events no faster than `rate`/s (and event-time/speedup) for `seconds`.
+
+    `events` is a Pushback: the event that would fall past `seconds` goes back
+    to it for the next step instead of being dropped.
+    """
+    start = time.perf_counter()
+    first_ts = None
+    n = 0
+    for ev in events:
+        due = n / rate if rate else 0.0
+        if speedup:
+            first_ts = ev[0] if first_ts is None else first_ts
+            due = max(due, (ev[0] - first_ts) / 1e9 / speedup)
+        if due > seconds:
+            events.push(ev)
+            return
+        delay = start + due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield ev
+        n += 1
+
+
+def to_debezium(table, key, value):
+    now_ns = time.time_ns()
+    value = dict(value)
+    value["__op"] = "c"
+    value["__table"] = table
+    value["__source_ts_ms"] = now_ns // 1_000_000
+    value["__deleted"] = "false"
+    value["__replay_sent_ns"] = now_ns      # harness-only, sub-ms latency
+    return json.dumps(key).encode(), json.dumps(value).encode()
+
+
+class LocalBroker:
+    """In-process stand-in for the Kafka topics (one FIFO across all topics)."""
+
+    def __init__(self):
+        self.q = queue.SimpleQueue()
+
+    def produce(self, topic, key, value):
+        self.q.put((topic, key, value))
+
+    def flush(self):
+        pass
+
+    def poll(self, timeout):
+        try:
+            return self.q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class KafkaBroker:
+
+    def __init__(self, topics):
+        from confluent_kafka import Producer, Consumer
+        self.producer = Producer({"bootstrap.servers": BOOTSTRAP, "linger.ms": 5})
+        self.consumer = Consumer({
+            "bootstrap.servers": BOOTSTRAP,
+            "group.id": f"replay-{int(time.time()*1000)}",
+            "auto.offset.reset": "latest",
+            "enable.auto.commit": False,
+        })
+        assigned = threading.Event()
+        self.consumer.subscribe(topics, on_assign=lambda c, p: assigned.set())
+        deadline = time.time() + 30
+        while not assigned.is_set() and time.time() < deadline:
+            self.consumer.poll(0.2)
+
+    def produce(self, topic, key, value):
+        while True:
+            try:
+                self.producer.produce(topic, value=value, key=key)
+                self.producer.poll(0)
+                return
+            except BufferError:
+                self.producer.poll(0.05)
+
+    def flush(self):
+        self.producer.flush()
+
+    def poll(self, timeout):
+        msg = self.consumer.poll(timeout)
+        if msg is None or msg.error():
+            return None
+        return msg.topic(), msg.key(), msg.value()
+
+    def close(self):
+        self.consumer.close()
+
+
+class ReplayScorer:
+    """Stand-in scoring path: device linkage for logins, near-threshold check for transactions."""
+
+    def __init__(self):
+        self.graph = LinkageGraph()
+        self.alerts = 0
+
+    def __call__(self, table, rec):
+        if table == "LOGINS":
+            self.graph.apply(table, rec)
+            hit = bool(self.graph.lookup(rec.get("CUSTOMER_ID", ""))["flags"])
+        else:
+            try:
+                amount = float(rec.get("AMOUNT") or 0)
+            except ValueError:
+                amount = 0.0
+            hit = THRESHOLD * (1 - BAND) <= amount < THRESHOLD
+        self.alerts += hit
+        return hit
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(p / 100 * len(sorted_vals))) - 1))
+    return sorted_vals[idx]
+
+
+def run_step(broker, events, rate, scorer):
+    sent = [0]
+    produced_sec = [STEP_SEC]
+    exhausted = [False]
+    done = threading.Event()
+
+    def produce():
+        start = time.perf_counter()
+        for ts, table, key, value in paced(events, rate, STEP_SEC):
+            k, v = to_debezium(table, key, value)
+            broker.produce(f"{TOPIC_PREFIX}.{table}", k, v)
+            sent[0] += 1
+        produced_sec[0] = max(time.perf_counter() - start, 1e-9)
+        # paced pushes back the first event of the next step unless the source ran out
+        exhausted[0] = not events.held
+        broker.flush()
+        done.set()
+
+    t0 = time.perf_counter()
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    latencies = []
+    last_seen = time.perf_counter()
+    while True:
+        msg = broker.poll(0.1)
+        now = time.perf_counter()
+        if msg is None:
+            if done.is_set() and (len(latencies) >= sent[0] or now - last_seen > DRAIN_SEC):
+                break
+            continue
+        topic, _, raw = msg
+        rec = json.loads(raw)
+        scorer(rec.get("__table") or topic.rsplit(".", 1)[-1], rec)
+        sent_ns = rec.get("__replay_sent_ns") or rec["__source_ts_ms"] * 1_000_000
+        latencies.append((time.time_ns() - sent_ns) / 1e6)
+        last_seen = now
+    elapsed = max(last_seen - t0, 1e-9)
+
+    latencies.sort()
+    return {
+        "target_rate": rate,
+        "sent": sent[0],
+        "consumed": len(latencies),
+        "exhausted": exhausted[0],
+        # over the time the producer actually ran: a source that ran out early
+        # offered its events faster than sent / STEP_SEC
+        "send_rate": round(sent[0] / produced_sec[0], 1),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    events = load_events()
+    topics = [f"{TOPIC_PREFIX}.{t}" for t in SOURCES]
+    broker = KafkaBroker(topics) if SINK == "kafka" else LocalBroker()
+    scorer = ReplayScorer()
+    steps = []
+    saturated_at = None
+    try:
+        for rate in RAMP:
+            step = run_step(broker, events, rate, scorer)
+            if step["sent"] == 0:
+                print("[REPLAY] source exhausted; raise REPLAY_SCALE for longer runs")
+                break
+            steps.append(step)
+            if step["consumed"] == 0:
+                # e.g. a Kafka consumer still unassigned, or offset=latest racing the producer
+                saturated_at = rate
+                print(f"[REPLAY] target {rate}/s: sent {step['sent']} events, consumed none; stopping")
+                break
+            print(f"[REPLAY] target {rate}/s: sent {step['send_rate']}/s, consumed {step['throughput']}/s, "
+                  f"p50 {step['p50_ms']:.2f}ms p95 {step['p95_ms']:.2f}ms p99 {step['p99_ms']:.2f}ms")
+            behind = step["throughput"] < SAT_RATIO * step["send_rate"] or step["consumed"] < step["sent"]
+            p99_growth = step["p99_ms"] > SAT_P99_GROWTH * max(steps[0]["p99_ms"], 1.0)
+            if step["exhausted"]:
+                print(f"[REPLAY] source exhausted after {step['sent']} events at {rate}/s; "
+                      f"raise REPLAY_SCALE for longer runs")
+            elif step["send_rate"] < SAT_RATIO * rate:
+                print(f"[REPLAY] producer cannot offer {rate}/s (got {step['send_rate']}/s)")
+            if behind or p99_growth:
+                saturated_at = rate
+                print(f"[REPLAY] saturation at {rate}/s "
+                      f"({'consumer behind' if behind else 'p99 growth'})")
+                break
+            if step["exhausted"]:
+                break
+    finally:
+        broker.close()
+
+    best = max((s["throughput"] for s in steps), default=0)
+    print(f"[REPLAY] sustained throughput {best}/s, {scorer.alerts} scoring hits, "
+          f"saturated at {saturated_at or 'n/a'}")
+    if REPORT:
+        with open(REPORT, "w") as f:
+            json.dump({"sink": SINK, "scale": SCALE, "steps": steps, "saturated_at": saturated_at}, f, indent=2)
+    return 0 if any(s["consumed"] for s in steps) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,456 @@
+"""
+RISK SCORES
+Rolls alerts up into a time-decayed risk score per customer and per account,
+updated in O(1) per alert with forward decay: an alert of risk r at time t
+adds r * exp(lam * (t - L)) for a fixed landmark L, and the score as of time
+T is that sum times exp(-lam * (T - L)). The decay factor is the same for every
+entity, so the stored sums rank entities correctly at any T and top-K comes
+straight from an indexed max-heap without re-scoring anyone.
+
+Alerts on an account (or on a transaction, whose entity_id is the account)
+count for the account and, through STG_ACCOUNTS.customer_id, for its
+customer. Each alert's contribution is kept by alert_id, so a re-sent or
+MERGE-updated alert replaces its old contribution and a delete removes it.
+
+`run` also follows the ACCOUNTS and CUSTOMERS CDC topics, so an account
+opened (or moved to another customer) after the last `build` rolls up to its
+customer: the contributions of alerts already filed under it are withdrawn
+and re-added on the new targets with their weight unchanged. A deleted
+account keeps its last customer, so its past alerts still count for them.
+
+Sources: ALERTS in Oracle (or an alerts CSV) for `build`, the aml.ALERTS and
+ALERTS CDC topics (plus ACCOUNTS / CUSTOMERS for the roll-up) for `run`.
+State and Kafka offsets are checkpointed to checkpoints/risk_scores.json.
+
+    python scripts/pipeline.py risk build [--csv resources/old/alerts.csv]
+    python scripts/pipeline.py risk run
+    python scripts/pipeline.py risk top --type CUSTOMER -k 20
+"""
+import os, sys, json, math, time, heapq, base64
+from datetime import datetime, timezone
+
+BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9094")
+TOPICS = os.getenv("RISK_TOPICS", "aml.ALERTS,orcl.APPUSER.ALERTS,"
+                   "orcl.APPUSER.ACCOUNTS,orcl.APPUSER.CUSTOMERS").split(",")
+ENTITY_TABLES = ("ACCOUNTS", "CUSTOMERS")       # topics that update the roll-up, not scores
+GROUP_ID = os.getenv("RISK_GROUP_ID", "risk-scores")
+CHECKPOINT_PATH = os.getenv("RISK_CHECKPOINT", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "checkpoints", "risk_scores.json"))
+CHECKPOINT_SEC = float(os.getenv("RISK_CHECKPOINT_SEC", "10"))
+HALF_LIFE_DAYS = float(os.getenv("RISK_HALF_LIFE_DAYS", "30"))
+BATCH = int(os.getenv("RISK_BATCH", "1000"))
+
+# move the landmark before exp() gets anywhere near float overflow (~709)
+MAX_EXPONENT = 300.0
+# ALERTS.risk_score is NUMBER(5,2); the scale a precise-mode base64 decimal is read with
+RISK_SCORE_SCALE = 2
+
+
+class IndexedMaxHeap:
+    """Max-heap of key -> value with a position index: update / remove in O(log n)."""
+
+    def __init__(self):
+        self.keys = []
+        self.vals = []
+        self.pos = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.pos
+
+    def get(self, key, default=0.0):
+        i = self.pos.get(key)
+        return default if i is None else self.vals[i]
+
+    def set(self, key, value):
+        i = self.pos.get(key)
+        if i is None:
+            self.keys.append(key)
+            self.vals.append(value)
+            i = self.pos[key] = len(self.keys) - 1
+            self._up(i)
+        else:
+            old, self.vals[i] = self.vals[i], value
+            self._up(i) if value > old else self._down(i)
+
+    def remove(self, key):
+        i = self.pos.pop(key, None)
+        if i is None:
+            return
+        last_key, last_val = self.keys.pop(), self.vals.pop()
+        if i < len(self.keys):
+            self.keys[i], self.vals[i] = last_key, last_val
+            self.pos[last_key] = i
+            self._up(i)
+            self._down(self.pos[last_key])
+
+    def scale(self, factor):
+        """Multiply every value by a positive factor; order is unchanged."""
+        self.vals = [v * factor for v in self.vals]
+
+    def top(self, k):
+        """k largest (key, value), best first, in O(k log k) by walking the heap from the root."""
+        out, frontier = [], [(-self.vals[0], 0)] if self.keys else []
+        while frontier and len(out) < k:
+            neg, i = heapq.heappop(frontier)
+            out.append((self.keys[i], -neg))
+            for c in (2 * i + 1, 2 * i + 2):
+                if c < len(self.keys):
+                    heapq.heappush(frontier, (-self.vals[c], c))
+        return out
+
+    def _swap(self, i, j):
+        self.keys[i], self.keys[j] = self.keys[j], self.keys[i]
+        self.vals[i], self.vals[j] = self.vals[j], self.vals[i]
+        self.pos[self.keys[i]], self.pos[self.keys[j]] = i, j
+
+    def _up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.vals[i] <= self.vals[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _down(self, i):
+        n = len(self.keys)
+        while True:
+            best, l, r = i, 2 * i + 1, 2 * i + 2
+            if l < n and self.vals[l] > self.vals[best]:
+                best = l
+            if r < n and self.vals[r] > self.vals[best]:
+                best = r
+            if best == i:
+                return
+            self._swap(i, best)
+            i = best
+
+
+def _epoch_s(ts):
+    """created_ts as epoch seconds: Debezium epoch ms / micros / nanos, ISO text, or a datetime."""
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        # connect mode sends millis; adaptive mode sends TIMESTAMP(6) as micros.
+        # 1e14 ms would be the year 5138, so the magnitude tells them apart
+        if abs(ts) >= 1e17:
+            return ts / 1e9
+        if abs(ts) >= 1e14:
+            return ts / 1e6
+        return ts / 1000.0
+    if not isinstance(ts, datetime):
+        ts = datetime.fromisoformat(str(ts).strip())
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _risk(value):
+    """risk_score as float: a number, numeric text, or a precise-mode base64 decimal."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        unscaled = int.from_bytes(base64.b64decode(value, validate=True), "big", signed=True)
+        return unscaled / 10 ** RISK_SCORE_SCALE
+
+
+class RiskScores:
+
+    def __init__(self, accounts=None, customers=None, half_life_days=HALF_LIFE_DAYS, landmark=None):
+        self.accounts = accounts or {}                  # account_id -> customer_id
+        # known customer ids, so a customer id filed under another entity_type still counts as one
+        self.customers = set(customers or ()) | set(self.accounts.values())
+        self.half_life_days = half_life_days
+        self.lam = math.log(2) / (half_life_days * 86400)
+        self.landmark = landmark
+        self.last_ts = None
+        self.heaps = {}                                 # entity_type -> IndexedMaxHeap
+        self.contrib = {}                               # alert_id -> (targets, forward-decayed weight)
+        self.live = {}                                  # (entity_type, entity_id) -> live contributions
+        self.by_entity = {}                             # entity_id an alert is filed under -> alert_ids
+        self.offsets = {}                               # "topic|partition" -> next offset
+
+    def targets(self, entity_type, entity_id):
+        entity_type, entity_id = str(entity_type).strip().upper(), str(entity_id).strip().upper()
+        customer = self.accounts.get(entity_id)
+        if customer is not None:
+            return [("ACCOUNT", entity_id), ("CUSTOMER", customer)]
+        if entity_type == "CUSTOMER" or entity_id in self.customers:
+            return [("CUSTOMER", entity_id)]
+        return [(entity_type, entity_id)]
+
+    def _weight(self, risk, ts):
+        if self.landmark is None:
+            self.landmark = ts
+        if self.lam * (ts - self.landmark) > MAX_EXPONENT:
+            self._move_landmark(ts)
+        return risk * math.exp(self.lam * (ts - self.landmark))
+
+    def _move_landmark(self, ts):
+        factor = math.exp(-self.lam * (ts - self.landmark))
+        for heap in self.heaps.values():
+            heap.scale(factor)
+        self.contrib = {a: (t, w * factor) for a, (t, w) in self.contrib.items()}
+        self.landmark = ts
+
+    def _add(self, target, w, count):
+        """Add (count=1) or withdraw (count=-1, w negated) one alert's weight for one entity."""
+        heap = self.heaps.setdefault(target[0], IndexedMaxHeap())
+        n = self.live.get(target, 0) + count
+        if n <= 0:
+            # the sum alone cannot tell: an old alert's weight can be far below float
+            # rounding of a newer one, so the entity goes only with its last alert
+            self.live.pop(target, None)
+            heap.remove(target[1])
+        else:
+            self.live[target] = n
+            heap.set(target[1], max(heap.get(target[1]) + w, 0.0))
+
+    def apply(self, alert, deleted=False):
+        """Add (or replace, or with deleted=True withdraw) one alert's contribution."""
+        alert = {str(k).lower(): v for k, v in alert.items()}
+        alert_id = alert.get("alert_id")
+        if alert_id is None:
+            return
+        # parse before touching state, so a malformed record leaves the old contribution in place
+        ts = risk = None
+        if not deleted:
+            ts = _epoch_s(alert.get("created_ts"))
+            risk = _risk(alert["risk_score"]) if alert.get("risk_score") is not None else None
+        old = self.contrib.pop(alert_id, None)
+        if old is not None:
+            for t in old[0]:
+                self._add(t, -old[1], -1)
+            self._unindex(alert_id, old[0])
+        if deleted or ts is None or risk is None or alert.get("entity_id") is None:
+            return
+        targets = self.targets(alert.get("entity_type"), alert["entity_id"])
+        w = self._weight(risk, ts)
+        for t in targets:
+            self._add(t, w, 1)
+        self.contrib[alert_id] = (targets, w)
+        self._index(alert_id, targets)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+    # targets()[0] is always the entity the alert was filed under
+    def _index(self, alert_id, targets):
+        self.by_entity.setdefault(targets[0][1], set()).add(alert_id)
+
+    def _unindex(self, alert_id, targets):
+        ids = self.by_entity.get(targets[0][1])
+        if ids is not None:
+            ids.discard(alert_id)
+            if not ids:
+                del self.by_entity[targets[0][1]]
+
+    def _retarget(self, entity_id):
+        """Move the alerts filed under `entity_id` to its current targets."""
+        for alert_id in self.by_entity.get(entity_id, ()):
+            old, w = self.contrib[alert_id]
+            new = self.targets(old[0][0], entity_id)
+            if new == old:
+                continue
+            for t in old:
+                self._add(t, -w, -1)
+            for t in new:
+                self._add(t, w, 1)
+            self.contrib[alert_id] = (new, w)
+
+    def set_account(self, account_id, customer_id):
+        """Map (or re-map) an account to its customer; its alerts follow."""
+        account_id, customer_id = str(account_id).strip().upper(), str(customer_id).strip().upper()
+        if not account_id or not customer_id or self.accounts.get(account_id) == customer_id:
+            return
+        self.accounts[account_id] = customer_id
+        self.add_customer(customer_id)
+        self._retarget(account_id)
+
+    def add_customer(self, customer_id):
+        customer_id = str(customer_id).strip().upper()
+        if customer_id and customer_id not in self.customers:
+            self.customers.add(customer_id)
+            self._retarget(customer_id)
+
+    def apply_entity(self, table, rec, deleted=False):
+        """Apply one ACCOUNTS / CUSTOMERS CDC record to the roll-up map (deletes keep it)."""
+        rec = {str(k).lower(): v for k, v in rec.items()}
+        table = table.upper().rsplit(".", 1)[-1]
+        if deleted or rec.get("customer_id") is None:
+            return
+        if table == "ACCOUNTS" and rec.get("account_id") is not None:
+            self.set_account(rec["account_id"], rec["customer_id"])
+        elif table == "CUSTOMERS":
+            self.add_customer(rec["customer_id"])
+
+    def _decay(self, as_of):
+        as_of = self.last_ts if as_of is None else as_of
+        return math.exp(-self.lam * (as_of - self.landmark)) if self.landmark is not None else 0.0
+
+    def score(self, entity_type, entity_id, as_of=None):
+        heap = self.heaps.get(entity_type)
+        return heap.get(entity_id) * self._decay(as_of) if heap else 0.0
+
+    def top(self, entity_type="CUSTOMER", k=10, as_of=None):
+        heap = self.heaps.get(entity_type)
+        if not heap:
+            return []
+        decay = self._decay(as_of)
+        return [(key, value * decay) for key, value in heap.top(k)]
+
+    # -------- checkpoint --------
+    def save(self, path=CHECKPOINT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"half_life_days": self.half_life_days, "landmark": self.landmark, "last_ts": self.last_ts,
+                       "offsets": self.offsets, "accounts": self.accounts, "customers": sorted(self.customers),
+                       "contrib": {a: [t, w] for a, (t, w) in self.contrib.items()}}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CHECKPOINT_PATH):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        rs = cls(data["accounts"], data["customers"], data["half_life_days"], data["landmark"])
+        rs.last_ts, rs.offsets = data["last_ts"], data["offsets"]
+        # heaps are rebuilt from the per-alert contributions, so they cannot drift from them
+        for alert_id, (targets, w) in data["contrib"].items():
+            targets = [tuple(t) for t in targets]
+            for t in targets:
+                rs._add(t, w, 1)
+            rs.contrib[alert_id] = (targets, w)
+            rs._index(alert_id, targets)
+        return rs
+
+
+def load_entities(engine):
+    """account_id -> customer_id from STG_ACCOUNTS, and all STG_CUSTOMER ids."""
+    import pandas as pd
+    df = pd.read_sql_query("SELECT account_id, customer_id FROM STG_ACCOUNTS", engine)
+    df.columns = [str(c).lower() for c in df.columns]
+    cust = pd.read_sql_query("SELECT customer_id FROM STG_CUSTOMER", engine).iloc[:, 0]
+    accounts = dict(zip(df["account_id"].str.strip().str.upper(), df["customer_id"].str.strip().str.upper()))
+    return accounts, set(cust.str.strip().str.upper())
+
+
+def _engine():
+    import sqlalchemy
+    from dataCleaning import USER, pwd_enc, dsn_enc
+    return sqlalchemy.create_engine(f"oracle+oracledb://{USER}:{pwd_enc}@/?dsn={dsn_enc}")
+
+
+def build(csv=None, accounts_csv=None):
+    """Rebuild scores from scratch: ALERTS in Oracle, or an alerts CSV."""
+    import pandas as pd
+    if csv:
+        accounts, customers = {}, None
+        if accounts_csv:
+            acc = pd.read_csv(accounts_csv, dtype=str)
+            accounts = dict(zip(acc["account_id"].str.strip().str.upper(), acc["customer_id"].str.strip().str.upper()))
+        alerts = pd.read_csv(csv, dtype={"risk_score": float})
+    else:
+        engine = _engine()
+        accounts, customers = load_entities(engine)
+        alerts = pd.read_sql_query("SELECT * FROM ALERTS", engine)
+    alerts = alerts.astype(object).where(alerts.notna(), None)
+    prev = RiskScores.load()
+    rs = RiskScores(accounts, customers)
+    if prev is not None:
+        rs.offsets = prev.offsets        # the topics still resume where `run` left off
+    t0 = time.perf_counter()
+    for alert in alerts.to_dict(orient="records"):
+        if isinstance(alert.get("created_ts"), pd.Timestamp):
+            alert["created_ts"] = alert["created_ts"].to_pydatetime()
+        rs.apply(alert)
+    rs.save()
+    print(f"[RISK] {len(alerts)} alerts in {(time.perf_counter() - t0) * 1000:.0f} ms; "
+          + ", ".join(f"{len(h)} {t.lower()}" for t, h in sorted(rs.heaps.items())))
+    return rs
+
+
+def run(max_idle_sec=None):
+    from confluent_kafka import Consumer, KafkaError, KafkaException, OFFSET_BEGINNING
+    rs = RiskScores.load()
+    if rs is None:
+        rs = RiskScores(*load_entities(_engine()))
+    consumer = Consumer({
+        "bootstrap.servers": BOOTSTRAP,
+        "group.id": GROUP_ID,
+        "enable.auto.commit": False,      # offsets live in the checkpoint
+        "auto.offset.reset": "earliest",
+    })
+
+    def on_assign(c, partitions):
+        for tp in partitions:
+            tp.offset = rs.offsets.get(f"{tp.topic}|{tp.partition}", OFFSET_BEGINNING)
+        c.assign(partitions)
+        print(f"[RISK] assigned {[(tp.topic, tp.partition, tp.offset) for tp in partitions]}")
+
+    consumer.subscribe(TOPICS, on_assign=on_assign)
+    applied, skipped, idle_since, saved_at = 0, 0, time.time(), time.time()
+    try:
+        while True:
+            msgs = consumer.consume(num_messages=BATCH, timeout=1.0)
+            for m in msgs:
+                if m.error():
+                    if m.error().code() == KafkaError._PARTITION_EOF:
+                        continue
+                    raise KafkaException(m.error())
+                raw = m.value()
+                if raw is not None:       # tombstones follow the rewrite-mode delete record
+                    try:
+                        value = json.loads(raw)
+                        deleted = str(value.get("__deleted", "false")).lower() == "true" or value.get("__op") == "d"
+                        table = m.topic().rsplit(".", 1)[-1].upper()
+                        if table in ENTITY_TABLES:
+                            rs.apply_entity(table, value, deleted=deleted)
+                        else:
+                            rs.apply(value, deleted=deleted)
+                        applied += 1
+                    except (ValueError, TypeError, AttributeError) as e:
+                        skipped += 1
+                        print(f"[RISK] skipping {m.topic()}[{m.partition()}]@{m.offset()}: {e!r}")
+                rs.offsets[f"{m.topic()}|{m.partition()}"] = m.offset() + 1
+            if msgs:
+                idle_since = time.time()
+            elif max_idle_sec is not None and time.time() - idle_since > max_idle_sec:
+                break
+            if time.time() - saved_at >= CHECKPOINT_SEC:
+                rs.save()
+                saved_at = time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rs.save()
+        consumer.close()
+    print(f"[RISK] applied {applied} records, skipped {skipped}")
+    return 0
+
+
+def main(action="top", csv=None, accounts_csv=None, entity_type="CUSTOMER", k=10):
+    if action == "build":
+        build(csv, accounts_csv)
+        return 0
+    if action == "run":
+        # RISK_IDLE_EXIT=<sec> stops once caught up
+        idle = os.getenv("RISK_IDLE_EXIT")
+        return run(float(idle) if idle else None)
+    rs = RiskScores.load()
+    if rs is None:
+        print("[RISK] no checkpoint yet; run `risk build` or `risk run` first")
+        return 1
+    as_of = datetime.fromtimestamp(rs.last_ts, timezone.utc) if rs.last_ts else None
+    print(f"[RISK] top {k} {entity_type.lower()} by risk as of {as_of:%Y-%m-%d %H:%M} "
+          f"(half-life {rs.half_life_days:g} days)" if as_of else "[RISK] no alerts applied")
+    for rank, (entity_id, score) in enumerate(rs.top(entity_type.upper(), k), start=1):
+        print(f"  {rank:>3}. {entity_id:<12} {score:8.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
@@ -0,0 +1,96 @@
+"""
+RUN MANIFEST
+Records status, row counts and timings per stage of a batch job in
+runs/<job>.json. A run that failed part-way resumes from its first
+incomplete stage; completed stages are skipped unless forced.
+"""
+import os, json, time, uuid
+from datetime import datetime, timezone
+
+RUN_DIR = os.getenv("PIPELINE_RUN_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "runs"))
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunManifest:
+
+    def __init__(self, job, force=None, new_run=False, run_dir=RUN_DIR):
+        """force: None, a list of stage names, or ["all"] to redo completed stages."""
+        self.job = job
+        self.path = os.path.join(run_dir, f"{job}.json")
+        self.force = set(force or [])
+        prev = self.load(job, run_dir)
+        if prev and prev.get("status") != DONE and not new_run:
+            self.data = prev
+            self.data["attempts"] = prev.get("attempts", 1) + 1
+            print(f"[RUN] resuming {job} run {prev['run_id']} (attempt {self.data['attempts']})")
+        else:
+            self.data = {"job": job, "run_id": uuid.uuid4().hex[:12], "status": RUNNING,
+                         "started_at": _now(), "attempts": 1, "stages": {}}
+            print(f"[RUN] starting {job} run {self.data['run_id']}")
+        self.data["status"] = RUNNING
+        self.save()
+
+    @staticmethod
+    def load(job, run_dir=RUN_DIR):
+        path = os.path.join(run_dir, f"{job}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+    def is_done(self, name):
+        return self.data["stages"].get(name, {}).get("status") == DONE
+
+    def run(self, name, fn, *args, commit=None):
+        """Run one stage unless already done; `commit` is called before the stage is marked done."""
+        if self.is_done(name) and "all" not in self.force and name not in self.force:
+            st = self.data["stages"][name]
+            print(f"[RUN] {name}: done in an earlier attempt ({st.get('rows')} rows), skipping")
+            return st.get("rows")
+        st = self.data["stages"][name] = {"status": RUNNING, "started_at": _now()}
+        self.save()
+        t0 = time.perf_counter()
+        try:
+            rows = fn(*args)
+            if commit is not None:
+                commit()
+        except BaseException as e:
+            st.update(status=FAILED, seconds=round(time.perf_counter() - t0, 3), error=repr(e)[:500])
+            self.data["status"] = FAILED
+            self.save()
+            raise
+        st.update(status=DONE, rows=rows, seconds=round(time.perf_counter() - t0, 3), finished_at=_now())
+        st.pop("error", None)
+        self.save()
+        print(f"[RUN] {name}: {rows} rows in {st['seconds']}s")
+        return rows
+
+    def finish(self):
+        self.data["status"] = DONE
+        self.data["finished_at"] = _now()
+        self.save()
+        total = sum(s.get("seconds", 0) for s in self.data["stages"].values())
+        print(f"[RUN] {self.job} run {self.data['run_id']} complete ({total:.1f}s of stage time)")
+
+
+def summary(job, run_dir=RUN_DIR):
+    data = RunManifest.load(job, run_dir)
+    if not data:
+        return f"{job}: no runs recorded"
+    lines = [f"{job} run {data['run_id']}: {data['status']} (attempt {data.get('attempts', 1)}, started {data['started_at']})"]
+    for name, st in data["stages"].items():
+        lines.append(f"  {name:<20} {st['status']:<8} rows={st.get('rows')} seconds={st.get('seconds')}"
+                     + (f" error={st['error']}" if st.get("error") else ""))
+    return "\n".join(lines)
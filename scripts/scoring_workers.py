@@ -0,0 +1,288 @@
+"""
+SCORING WORKERS
+A supervisor runs one scoring process per core in a shared consumer group on
+the TRANSACTIONS and LOGINS CDC topics. oracle-cdc.json routes transactions by
+SRC_ACCOUNT_ID and logins by CUSTOMER_ID, so all events of one account /
+customer land on one partition and each worker owns the state of exactly the
+partitions it is assigned.
+
+Per-partition state and its next offset are checkpointed together
+(checkpoints/<topic>-<partition>.json) periodically and on revoke; on assign
+a worker reloads the checkpoint and seeks to that offset, so a rebalance
+neither loses nor double-counts events. Alerts go to ALERT_TOPIC with
+deterministic ids, so events replayed after a crash overwrite their alerts.
+"""
+import os, sys, json, time, signal, hashlib
+import multiprocessing as mp
+import numpy as np
+
+BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9094")
+TOPICS = os.getenv("SCORING_TOPICS", "orcl.APPUSER.TRANSACTIONS,orcl.APPUSER.LOGINS").split(",")
+GROUP_ID = os.getenv("SCORING_GROUP_ID", "aml-scoring")
+ALERT_TOPIC = os.getenv("SCORING_ALERT_TOPIC", "aml.ALERTS")
+WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 1)))
+CHECKPOINT_DIR = os.getenv("SCORING_CHECKPOINT_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "checkpoints"))
+CHECKPOINT_SEC = float(os.getenv("SCORING_CHECKPOINT_SEC", "10"))
+BATCH = int(os.getenv("SCORING_BATCH", "2000"))
+
+THRESHOLD = float(os.getenv("AML_THRESHOLD", "10000"))
+BAND = float(os.getenv("AML_BAND", "0.10"))
+MIN_DAILY = int(os.getenv("AML_MIN_DAILY", "3"))
+VELOCITY_1H = int(os.getenv("SCORING_VELOCITY_1H", "5"))
+SPIKE_MULT = float(os.getenv("SCORING_SPIKE_MULT", "10"))
+LOGIN_FAIL_1H = int(os.getenv("SCORING_LOGIN_FAIL_1H", "5"))
+
+HOUR_MS = 3_600_000
+DAY_MS = 24 * HOUR_MS
+
+
+def _alert(reason, entity_type, entity_id, event_id, score, ts_ms):
+    key = f"{reason}|{event_id}"
+    return {
+        "alert_id": "AL-" + hashlib.sha1(key.encode()).hexdigest()[:16].upper(),
+        "case_id": None,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "reason_code": reason,
+        "risk_score": round(min(100.0, score), 2),
+        "created_ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts_ms / 1000)),
+    }
+
+
+class PartitionState:
+    """Per-entity rolling windows for one partition, plus the next offset to read."""
+
+    def __init__(self, topic, partition, next_offset=None, entities=None):
+        self.topic = topic
+        self.partition = partition
+        self.next_offset = next_offset
+        self.entities = entities or {}   # entity id -> list of [ts_ms, value]
+
+    @property
+    def path(self):
+        return os.path.join(CHECKPOINT_DIR, f"{self.topic}-{self.partition}.json")
+
+    @classmethod
+    def load(cls, topic, partition):
+        st = cls(topic, partition)
+        if os.path.exists(st.path):
+            with open(st.path) as f:
+                data = json.load(f)
+            st.next_offset, st.entities = data["next_offset"], data["entities"]
+        return st
+
+    def save(self):
+        if self.next_offset is None:
+            return
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"next_offset": self.next_offset, "entities": self.entities}, f)
+        os.replace(tmp, self.path)
+
+    def window(self, entity, ts_ms, value):
+        """Append an event and drop everything older than a day (event time)."""
+        events = self.entities.setdefault(entity, [])
+        events.append([ts_ms, value])
+        cutoff = ts_ms - DAY_MS
+        if events[0][0] < cutoff:
+            events[:] = [e for e in events if e[0] >= cutoff]
+        return events
+
+
+def score_transactions(state, batch):
+    alerts = []
+    live = batch.live() & ~np.isnat(batch["TS"])
+    ts = batch["TS"].astype("int64")
+    for ok, txn_id, acct, amount, t in zip(live, batch["TXN_ID"], batch["SRC_ACCOUNT_ID"], batch["AMOUNT"], ts):
+        if not ok or acct is None or amount != amount:   # NaN amount
+            continue
+        acct = str(acct).strip().upper()
+        events = state.window(acct, int(t), float(amount))
+        prior = events[:-1]
+        last_hour = sum(1 for e in events if e[0] >= t - HOUR_MS)
+        near = sum(1 for e in events if THRESHOLD * (1 - BAND) <= e[1] < THRESHOLD)
+        if last_hour >= VELOCITY_1H:
+            alerts.append(_alert("VELOCITY_1H", "ACCOUNT", acct, txn_id, 40 + 10 * (last_hour - VELOCITY_1H), t))
+        if near >= MIN_DAILY and THRESHOLD * (1 - BAND) <= amount < THRESHOLD:
+            alerts.append(_alert("STRUCTURING", "ACCOUNT", acct, txn_id, 50 + 10 * (near - MIN_DAILY), t))
+        if len(prior) >= 3:
+            mean = sum(e[1] for e in prior) / len(prior)
+            if mean > 0 and amount >= SPIKE_MULT * mean:
+                alerts.append(_alert("AMOUNT_SPIKE", "ACCOUNT", acct, txn_id, 30 + 5 * amount / mean, t))
+    return alerts
+
+
+def score_logins(state, batch):
+    alerts = []
+    live = batch.live() & ~np.isnat(batch["TS"])
+    ts = batch["TS"].astype("int64")
+    for ok, login_id, cust, result, t in zip(live, batch["LOGIN_ID"], batch["CUSTOMER_ID"], batch["RESULT"], ts):
+        if not ok or cust is None:
+            continue
+        cust = str(cust).strip().upper()
+        failed = str(result).strip().upper() in ("FAIL", "FAILED")
+        events = state.window(cust, int(t), 1 if failed else 0)
+        fails = sum(e[1] for e in events if e[0] >= t - HOUR_MS)
+        if failed and fails >= LOGIN_FAIL_1H:
+            alerts.append(_alert("LOGIN_FAILURES_1H", "CUSTOMER", cust, login_id, 40 + 10 * (fails - LOGIN_FAIL_1H), t))
+    return alerts
+
+
+SCORERS = {"TRANSACTIONS": score_transactions, "LOGINS": score_logins}
+
+
+class Worker:
+
+    def __init__(self, idx):
+        from confluent_kafka import Consumer, Producer
+        self.idx = idx
+        self.states = {}     # (topic, partition) -> PartitionState
+        self.last_checkpoint = time.time()
+        self.processed = 0
+        self.producer = Producer({"bootstrap.servers": BOOTSTRAP, "linger.ms": 20})
+        self.consumer = Consumer({
+            "bootstrap.servers": BOOTSTRAP,
+            "group.id": GROUP_ID,
+            "enable.auto.commit": False,      # offsets are committed only after a checkpoint
+            "auto.offset.reset": "earliest",
+        })
+        self.consumer.subscribe(TOPICS, on_assign=self.on_assign, on_revoke=self.on_revoke)
+
+    def log(self, msg):
+        print(f"[SCORE w{self.idx}] {msg}", flush=True)
+
+    def on_assign(self, consumer, partitions):
+        for tp in partitions:
+            st = PartitionState.load(tp.topic, tp.partition)
+            self.states[(tp.topic, tp.partition)] = st
+            if st.next_offset is not None:
+                tp.offset = st.next_offset
+        consumer.assign(partitions)
+        self.log(f"assigned {[(tp.topic.rsplit('.', 1)[-1], tp.partition, tp.offset) for tp in partitions]}")
+
+    def on_revoke(self, consumer, partitions):
+        keys = [(tp.topic, tp.partition) for tp in partitions]
+        self.checkpoint(keys)
+        for k in keys:
+            self.states.pop(k, None)
+        self.log(f"revoked {[(t.rsplit('.', 1)[-1], p) for t, p in keys]}")
+
+    def checkpoint(self, keys=None):
+        from confluent_kafka import TopicPartition
+        keys = list(self.states) if keys is None else keys
+        offsets = []
+        self.producer.flush()           # alerts before the offsets that produced them
+        for k in keys:
+            st = self.states.get(k)
+            if st is None or st.next_offset is None:
+                continue
+            st.save()
+            offsets.append(TopicPartition(st.topic, st.partition, st.next_offset))
+        if offsets:
+            try:
+                self.consumer.commit(offsets=offsets, asynchronous=False)
+            except Exception as e:      # checkpoint files stay authoritative
+                self.log(f"offset commit failed: {e}")
+        self.last_checkpoint = time.time()
+
+    def process(self, msgs):
+        from cdc_decode import decode
+        groups = {}
+        for m in msgs:
+            groups.setdefault((m.topic(), m.partition()), []).append(m)
+        for (topic, partition), group in groups.items():
+            st = self.states.get((topic, partition))
+            if st is None:               # revoked between poll and processing
+                continue
+            table = topic.rsplit(".", 1)[-1].upper()
+            batch = decode(table, [m.value() for m in group])
+            for a in SCORERS[table](st, batch):
+                self.producer.produce(ALERT_TOPIC, key=a["alert_id"], value=json.dumps(a))
+            st.next_offset = group[-1].offset() + 1
+            self.processed += len(group)
+        self.producer.poll(0)
+
+    def run(self, stop):
+        from confluent_kafka import KafkaError, KafkaException
+        t0, reported = time.time(), 0
+        try:
+            while not stop.is_set():
+                msgs = self.consumer.consume(num_messages=BATCH, timeout=1.0)
+                good = []
+                for m in msgs:
+                    if m.error():
+                        if m.error().code() == KafkaError._PARTITION_EOF:
+                            continue
+                        raise KafkaException(m.error())
+                    good.append(m)
+                if good:
+                    self.process(good)
+                if time.time() - self.last_checkpoint >= CHECKPOINT_SEC:
+                    self.checkpoint()
+                    rate = (self.processed - reported) / max(time.time() - t0, 1e-9)
+                    self.log(f"{self.processed} events, {rate:,.0f}/s")
+                    t0, reported = time.time(), self.processed
+        finally:
+            self.checkpoint()
+            self.consumer.close()
+            self.producer.flush()
+
+
+def _worker_main(idx, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # the supervisor decides when to stop
+    Worker(idx).run(stop)
+
+
+def partition_counts(timeout=5):
+    """topic -> partition count from broker metadata ({} if the broker does not answer)."""
+    from confluent_kafka import KafkaException, admin
+    try:
+        md = admin.AdminClient({"bootstrap.servers": BOOTSTRAP}).list_topics(timeout=timeout)
+    except KafkaException:
+        return {}
+    return {t: len(md.topics[t].partitions) for t in TOPICS if t in md.topics}
+
+
+def supervise(n=WORKERS):
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    counts = partition_counts()
+    # the default range assignor splits each topic on its own, so a worker beyond
+    # the largest topic's partition count gets nothing from any topic
+    if counts and n > max(counts.values()):
+        print(f"[SCORE] {n} workers but at most {max(counts.values())} partitions per topic "
+              f"({', '.join(f'{t}={c}' for t, c in counts.items())}); extra workers stay idle")
+
+    def handle(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+    def start(i):
+        p = ctx.Process(target=_worker_main, args=(i, stop), name=f"scoring-{i}")
+        p.start()
+        return p
+
+    procs = {i: start(i) for i in range(n)}
+    print(f"[SCORE] started {n} workers in group {GROUP_ID}")
+    while not stop.is_set():
+        for i, p in procs.items():
+            if not p.is_alive() and not stop.is_set():
+                print(f"[SCORE] worker {i} exited with {p.exitcode}; restarting")
+                procs[i] = start(i)
+        stop.wait(1.0)
+    for p in procs.values():
+        p.join(timeout=30)
+        if p.is_alive():
+            p.terminate()
+    print("[SCORE] all workers stopped")
+    return 0
+
+
+def main():
+    return supervise()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,20 +11,23 @@ PWD  = os.getenv("ORACLE_APP_PWD",  "apppwd")
 DSN  = os.getenv("ORACLE_DSN",      "localhost/XEPDB1")
 DATA_DIR = os.getenv("DATA_DIR")
 
-FILES = {
-    "customers": os.path.join(DATA_DIR,"customers.csv"), 
-    "branches": os.path.join(DATA_DIR,"branches.csv"), 
-    "accounts": os.path.join(DATA_DIR,"accounts.csv"), 
-    "merchants": os.path.join(DATA_DIR,"merchants.csv"), 
-    "devices": os.path.join(DATA_DIR,"devices.csv"), 
-    "geos": os.path.join(DATA_DIR,"geos.csv"), 
-    "transactions": os.path.join(DATA_DIR,"transactions.csv"), 
-    "logins": os.path.join(DATA_DIR,"logins.csv"), 
-    "sanctions": os.path.join(DATA_DIR,"sanctions.csv"),  
-    "alerts": os.path.join(DATA_DIR,"alerts.csv"),
-}
-
-print("DATA_DIR:", DATA_DIR)
+def data_files(data_dir=None):
+    # built on demand so importing this module never needs DATA_DIR
+    data_dir = data_dir or DATA_DIR
+    if not data_dir:
+        raise SystemExit("DATA_DIR is not set (export it or add it to .env)")
+    return {
+        "customers": os.path.join(data_dir,"customers.csv"), 
+        "branches": os.path.join(data_dir,"branches.csv"), 
+        "accounts": os.path.join(data_dir,"accounts.csv"), 
+        "merchants": os.path.join(data_dir,"merchants.csv"), 
+        "devices": os.path.join(data_dir,"devices.csv"), 
+        "geos": os.path.join(data_dir,"geos.csv"), 
+        "transactions": os.path.join(data_dir,"transactions.csv"), 
+        "logins": os.path.join(data_dir,"logins.csv"), 
+        "sanctions": os.path.join(data_dir,"sanctions.csv"),  
+        "alerts": os.path.join(data_dir,"alerts.csv"),
+    }
 
 def load_csv(conn, name, path):
     print(f"Loading {name} from {path}")
@@ -68,7 +71,7 @@ def load_csv(conn, name, path):
 
 def main():
     with oracledb.connect(user=USER, password=PWD, dsn=DSN) as conn:
-        for name, path in FILES.items():
+        for name, path in data_files().items():
             load_csv(conn, name, path)
 
 if __name__ == "__main__":
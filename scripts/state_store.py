@@ -0,0 +1,185 @@
+"""
+LOCAL CDC STATE STORE
+One SQLite file per CDC table (state/<TABLE>.sqlite) holding the latest row
+per Debezium record key plus the Kafka offsets already applied. Upserts
+overwrite, deletes (`__deleted`=true from the rewrite tombstone mode, `__op`=d,
+or a null value) remove the key, so the file is a compacted view of the topic.
+Data and offsets are written in the same SQLite transaction; a restarted
+consumer loads the snapshot and seeks to the stored offsets instead of
+re-reading the topic from earliest.
+"""
+import os, sys, json, time, sqlite3
+
+STATE_DIR = os.getenv("STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "state"))
+BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9094")
+TOPICS = os.getenv("CDC_TOPICS",
+    "orcl.APPUSER.CUSTOMERS,orcl.APPUSER.ACCOUNTS,orcl.APPUSER.TRANSACTIONS,"
+    "orcl.APPUSER.BRANCHES,orcl.APPUSER.MERCHANTS,orcl.APPUSER.DEVICES,"
+    "orcl.APPUSER.GEOS,orcl.APPUSER.LOGINS,orcl.APPUSER.SANCTIONS,orcl.APPUSER.ALERTS"
+).split(",")
+GROUP_ID = os.getenv("STATE_GROUP_ID", "cdc-state-store")
+BATCH = int(os.getenv("STATE_BATCH", "1000"))
+
+
+def table_of(topic):
+    return topic.rsplit(".", 1)[-1].upper()
+
+
+def key_text(key):
+    """Canonical text form of a record key (bytes, str or dict)."""
+    if key is None:
+        return None
+    if isinstance(key, (bytes, bytearray)):
+        key = key.decode("utf-8")
+    if isinstance(key, str):
+        try:
+            key = json.loads(key)
+        except ValueError:
+            return key
+    return json.dumps(key, sort_keys=True, separators=(",", ":"))
+
+
+def is_delete(value):
+    if value is None:
+        return True
+    return str(value.get("__deleted", "false")).lower() == "true" or value.get("__op") == "d"
+
+
+class TableStore:
+
+    def __init__(self, table, state_dir=STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.table = table
+        self.path = os.path.join(state_dir, f"{table}.sqlite")
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS offsets (
+            topic TEXT, part INTEGER, next_offset INTEGER, PRIMARY KEY (topic, part))""")
+        self.db.commit()
+
+    def apply_batch(self, records, offsets):
+        """records: [(key, value_dict_or_None)]; offsets: {(topic, partition): next_offset}."""
+        upserts, deletes = {}, set()
+        for key, value in records:
+            k = key_text(key)
+            if k is None:
+                continue
+            if is_delete(value):
+                upserts.pop(k, None)
+                deletes.add(k)
+            else:
+                deletes.discard(k)
+                upserts[k] = json.dumps(value, separators=(",", ":"))
+        with self.db:
+            if deletes:
+                self.db.executemany("DELETE FROM kv WHERE k = ?", [(k,) for k in deletes])
+            if upserts:
+                self.db.executemany(
+                    "INSERT INTO kv (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v = excluded.v",
+                    upserts.items())
+            self.db.executemany(
+                "INSERT INTO offsets (topic, part, next_offset) VALUES (?, ?, ?) "
+                "ON CONFLICT(topic, part) DO UPDATE SET next_offset = excluded.next_offset",
+                [(t, p, o) for (t, p), o in offsets.items()])
+        return len(upserts), len(deletes)
+
+    def offsets(self):
+        return {(t, p): o for t, p, o in self.db.execute("SELECT topic, part, next_offset FROM offsets")}
+
+    def get(self, key):
+        row = self.db.execute("SELECT v FROM kv WHERE k = ?", (key_text(key),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def snapshot(self):
+        """Materialized table as {key_text: row}."""
+        return {k: json.loads(v) for k, v in self.db.execute("SELECT k, v FROM kv")}
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def compact(self):
+        self.db.execute("VACUUM")
+
+    def close(self):
+        self.db.close()
+
+
+class StateStore:
+    """TableStore per CDC topic, plus the rebalance hooks that seek to stored offsets."""
+
+    def __init__(self, topics=TOPICS, state_dir=STATE_DIR):
+        self.tables = {t: TableStore(table_of(t), state_dir) for t in topics}
+
+    def on_assign(self, consumer, partitions):
+        from confluent_kafka import OFFSET_BEGINNING
+        for tp in partitions:
+            stored = self.tables[tp.topic].offsets().get((tp.topic, tp.partition))
+            tp.offset = stored if stored is not None else OFFSET_BEGINNING
+        consumer.assign(partitions)
+        print(f"[STATE] assigned {[(tp.topic, tp.partition, tp.offset) for tp in partitions]}")
+
+    def apply_messages(self, msgs):
+        by_topic = {}
+        for msg in msgs:
+            raw = msg.value()
+            value = json.loads(raw) if raw is not None else None
+            recs, offs = by_topic.setdefault(msg.topic(), ([], {}))
+            recs.append((msg.key(), value))
+            offs[(msg.topic(), msg.partition())] = msg.offset() + 1
+        applied = 0
+        for topic, (recs, offs) in by_topic.items():
+            self.tables[topic].apply_batch(recs, offs)
+            applied += len(recs)
+        return applied
+
+    def close(self):
+        for t in self.tables.values():
+            t.close()
+
+
+def run(max_idle_sec=None):
+    from confluent_kafka import Consumer, KafkaError, KafkaException
+    store = StateStore()
+    for topic, t in store.tables.items():
+        print(f"[STATE] {t.table}: {len(t)} keys on disk, offsets {t.offsets() or 'none'}")
+    consumer = Consumer({
+        "bootstrap.servers": BOOTSTRAP,
+        "group.id": GROUP_ID,
+        "enable.auto.commit": False,      # offsets live in the state files
+        "auto.offset.reset": "earliest",
+    })
+    consumer.subscribe(list(store.tables), on_assign=store.on_assign)
+    applied, idle_since = 0, time.time()
+    try:
+        while True:
+            msgs = consumer.consume(num_messages=BATCH, timeout=1.0)
+            good = []
+            for m in msgs:
+                if m.error():
+                    if m.error().code() == KafkaError._PARTITION_EOF:
+                        continue
+                    raise KafkaException(m.error())
+                good.append(m)
+            if good:
+                applied += store.apply_messages(good)
+                idle_since = time.time()
+            elif max_idle_sec is not None and time.time() - idle_since > max_idle_sec:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        consumer.close()
+        store.close()
+    print(f"[STATE] applied {applied} records")
+    return 0
+
+
+def main():
+    # STATE_IDLE_EXIT=<sec> stops once caught up, e.g. to warm the store before a deploy
+    idle = os.getenv("STATE_IDLE_EXIT")
+    return run(float(idle) if idle else None)
+
+if __name__ == "__main__":
+    sys.exit(main())
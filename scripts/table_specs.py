@@ -0,0 +1,347 @@
+"""
+TABLE SPECS
+Declarative description of every STG table: source RAW table, key, columns
+with their Oracle type and cleaning rule, and how duplicates collapse. From a
+spec the projected SELECT, the CREATE TABLE and the MERGE are generated once
+per process (lru_cache) and `run_spec` runs any table through the same path:
+
+    projected SELECT of only the needed RAW columns -> column-wise cleaning
+    -> dedupe -> CREATE TABLE (ORA-00955 tolerated) -> executemany MERGE
+
+The cleaning rules are vectorized pandas string / numeric / datetime ops.
+RAW date columns mix layouts row by row, so dates and timestamps are parsed
+per known layout (DATE_FORMATS) and only values outside those go through
+the old per-value helpers.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+import oracledb, pandas as pd
+
+from dataCleaning import parse_date, clean_time
+
+TS_BIND = "TO_TIMESTAMP(:{name}, 'YYYY-MM-DD\"T\"HH24:MI:SS')"
+
+
+# -------- cleaning rules (Series -> Series) --------
+def upper_id(s):
+    return s.astype(str).str.strip().str.upper()
+
+def lower_str(s):
+    return s.astype(str).str.strip().str.lower()
+
+def clean_str(s):
+    # cleanStr: collapse whitespace runs, strip; missing stays missing
+    return s.where(s.isna(), s.astype(str).str.split().str.join(" "))
+
+def title_str(s):
+    return clean_str(s).str.title()
+
+# the layouts the RAW date columns actually use; each is parsed vectorized with an
+# explicit format, anything else (or anything a format rejects) goes through the old
+# per-value helper, which infers the format row by row
+DATE_FORMATS = (
+    (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d"),
+    (r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}", "%Y-%m-%dT%H:%M:%S"),
+    (r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", "%Y-%m-%d %H:%M:%S"),
+    (r"\d{2}/\d{2}/\d{4}", "%m/%d/%Y"),
+    (r"\d{2}/\d{2}/\d{4} \d{2}:\d{2}", "%m/%d/%Y %H:%M"),
+)
+
+def _parse_known(s):
+    """(timestamps, mask) for the values in one of DATE_FORMATS."""
+    text = s.where(s.notna(), "").astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=s.index, dtype="datetime64[us]")
+    for pattern, fmt in DATE_FORMATS:
+        hit = text.str.fullmatch(pattern)
+        if hit.any():
+            parsed[hit] = pd.to_datetime(text[hit], format=fmt, errors="coerce")
+    return parsed, parsed.notna()
+
+def to_date(s):
+    parsed, known = _parse_known(s)
+    out = s[~known].map(parse_date).astype(object)
+    return pd.concat([parsed[known].dt.normalize().astype(object), out]).reindex(s.index)
+
+def to_ts_text(s):
+    parsed, known = _parse_known(s)
+    out = s[~known].map(clean_time).astype(object)
+    # numpy's ISO text at second precision is clean_time's "%Y-%m-%dT%H:%M:%S" for naive values
+    text = pd.Series(parsed[known].to_numpy().astype("datetime64[s]").astype(str), index=parsed.index[known])
+    return pd.concat([text.astype(object), out]).reindex(s.index)
+
+def to_number(s):
+    return pd.to_numeric(s, errors="coerce")
+
+def to_int(s):
+    return s.astype(int)
+
+def money(s):
+    return pd.to_numeric(s, errors="coerce").round(2).fillna(0.0)
+
+def phone(s):
+    # phoneFix: 11 digits starting with 1 -> +<digits>, 10 digits -> +1<digits>, else None
+    digits = s.astype(str).str.replace(r"\D", "", regex=True).where(s.notna() & (s != ""))
+    n = digits.str.len()
+    out = ("+" + digits).where((n == 11) & digits.str.startswith("1"))
+    return out.where(n != 10, "+1" + digits).astype(object).where(lambda v: v.notna(), None)
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    sql_type: str
+    clean: Optional[Callable] = None
+    not_null: bool = False
+    bind: Optional[str] = None      # SQL around the bind variable, e.g. TO_TIMESTAMP(...)
+    update: bool = True             # include in WHEN MATCHED THEN UPDATE
+    source: bool = True             # read from the RAW table; False for values the MERGE computes
+    default: Optional[str] = None   # DDL DEFAULT, also backfills rows when the column is added later
+
+    @property
+    def width(self):
+        """VARCHAR2 length or integer NUMBER digits; None for dates and decimals."""
+        m = re.fullmatch(r"(?:VARCHAR2|NUMBER)\((\d+)\)", self.sql_type)
+        return int(m.group(1)) if m else None
+
+    @property
+    def bind_expr(self):
+        return (self.bind or ":{name}").format(name=self.name)
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    key: str
+    columns: Tuple[Column, ...]
+    source: Optional[str] = None    # RAW table; None for derived tables
+    dedupe: Optional[str] = None    # "first_by_key" | "key" | "exact"
+    dropna_key: bool = False
+    constraints: Tuple[str, ...] = ()
+    session_sql: Tuple[str, ...] = ()
+
+    @property
+    def column_names(self):
+        return [c.name for c in self.columns]
+
+    @property
+    def source_columns(self):
+        return [c.name for c in self.columns if c.source]
+
+
+# -------- compiled SQL, built once per spec --------
+@lru_cache(maxsize=None)
+def select_sql(spec):
+    cols = ", ".join(f'"{c}"' for c in spec.source_columns)
+    return f"SELECT {cols} FROM {spec.source}"
+
+
+def _column_ddl(spec, c):
+    line = f"{c.name:<16} {c.sql_type}"
+    if c.default:
+        line += f" DEFAULT {c.default}"
+    if c.name == spec.key:
+        line += " PRIMARY KEY"
+    elif c.not_null:
+        line += " NOT NULL"
+    return line
+
+
+@lru_cache(maxsize=None)
+def ddl_sql(spec):
+    lines = [_column_ddl(spec, c) for c in spec.columns]
+    lines += list(spec.constraints)
+    return f"CREATE TABLE {spec.name} (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+@lru_cache(maxsize=None)
+def merge_sql(spec):
+    names = spec.column_names
+    using = ",\n        ".join(f"{c.bind_expr:<20} AS {c.name}" for c in spec.columns)
+    updated = [c for c in spec.columns if c.name != spec.key and c.update]
+    updates = ",\n    ".join(f"d.{c.name:<16} = s.{c.name}" for c in updated)
+    # a re-run MERGEs every RAW row again; only rows whose data changed are updated, so
+    # computed columns such as load_ts move only then (DECODE treats two NULLs as equal)
+    changed = "\n   OR ".join(f"DECODE(d.{c.name}, s.{c.name}, 0, 1) = 1" for c in updated if c.source)
+    return (
+        f"MERGE INTO {spec.name} d\n"
+        f"USING (\n    SELECT\n        {using}\n    FROM dual\n) s\n"
+        f"ON (d.{spec.key} = s.{spec.key})\n"
+        + (f"WHEN MATCHED THEN UPDATE SET\n    {updates}\n" if updates else "")
+        + (f"WHERE {changed}\n" if updates and changed else "")
+        + f"WHEN NOT MATCHED THEN INSERT (\n    {', '.join(names)}\n"
+        f") VALUES (\n    {', '.join('s.' + n for n in names)}\n)"
+    )
+
+
+# -------- engine --------
+def ensure_table(cur, spec):
+    try:
+        cur.execute(ddl_sql(spec))
+        print(f"[STG] Created {spec.name}")
+    except oracledb.DatabaseError as e:
+            msg = str(e).lower()
+            if "ora-00955" in msg or "name is already used" in msg:
+                print(f"Table {spec.name} exists;")
+                add_missing_columns(cur, spec)
+            else:
+                raise
+
+
+def add_missing_columns(cur, spec):
+    """ALTER TABLE ADD spec columns an older version of the table was created without."""
+    cur.execute("SELECT column_name FROM user_tab_columns WHERE table_name = :t", t=spec.name)
+    have = {r[0].lower() for r in cur.fetchall()}
+    for c in spec.columns:
+        if c.name not in have:
+            cur.execute(f"ALTER TABLE {spec.name} ADD ({_column_ddl(spec, c)})")
+            print(f"[STG] Added {spec.name}.{c.name}")
+
+
+def merge_rows(cur, spec, rows):
+    for sql in spec.session_sql:
+        cur.execute(sql)
+    if rows:
+        cur.executemany(merge_sql(spec), rows)
+    return len(rows)
+
+
+def clean_frame(spec, df):
+    df = df.copy()
+    df.columns = [str(c).lower() for c in df.columns]
+    if spec.dropna_key:
+        df = df.dropna(subset=[spec.key])
+    for c in spec.columns:
+        if c.source and c.clean is not None:
+            df[c.name] = c.clean(df[c.name])
+    if spec.dedupe == "first_by_key":
+        df = df.sort_values([spec.key]).groupby(spec.key, as_index=False).agg("first")
+    elif spec.dedupe == "key":
+        df = df.drop_duplicates(subset=[spec.key], keep="first")
+    elif spec.dedupe == "exact":
+        df = df.drop_duplicates()
+    return df[spec.source_columns]
+
+
+def run_spec(engine, cur, spec):
+    df = pd.read_sql_query(select_sql(spec), engine)
+    df = clean_frame(spec, df)
+    ensure_table(cur, spec)
+    # NaN / NaT -> None in one pass instead of per value (normalize_rows)
+    rows = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    n = merge_rows(cur, spec, rows)
+    print(f"Data loaded successfully into {spec.name}! ({n} rows)")
+    return n
+
+
+# -------- registry --------
+def _ts(name, **kw):
+    return Column(name, "TIMESTAMP", to_ts_text, bind=TS_BIND, **kw)
+
+# when the MERGE last inserted or changed the row; the Parquet archive exports incrementally on it
+LOAD_TS = Column("load_ts", "TIMESTAMP", bind="SYSTIMESTAMP", default="SYSTIMESTAMP", source=False)
+
+SPECS = {s.name: s for s in [
+    TableSpec("STG_CUSTOMER", "customer_id", source="RAW_CUSTOMERS", dedupe="first_by_key",
+              session_sql=("ALTER SESSION DISABLE PARALLEL DML",), columns=(
+        Column("customer_id", "VARCHAR2(20)", upper_id),
+        Column("name", "VARCHAR2(200)", title_str),
+        Column("dob", "DATE", to_date),
+        Column("kyc_status", "VARCHAR2(20)", lambda s: s.astype(str).str.strip().str.upper()),
+        Column("email", "VARCHAR2(200)", lower_str),
+        Column("phone", "VARCHAR2(15)", phone),
+        Column("address", "VARCHAR2(400)", clean_str),
+        Column("city", "VARCHAR2(60)"),
+        Column("state", "VARCHAR2(60)"),
+        Column("zip", "NUMBER(7)", to_int),
+        Column("country", "VARCHAR2(60)"),
+    )),
+    TableSpec("STG_ACCOUNTS", "account_id", source="RAW_ACCOUNTS", dedupe="exact", constraints=(
+        "CONSTRAINT fk_acc_cust FOREIGN KEY (customer_id) REFERENCES STG_CUSTOMER(customer_id)",), columns=(
+        Column("account_id", "VARCHAR2(20)", upper_id),
+        Column("customer_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("type", "VARCHAR2(30)", lambda s: s.astype(str).str.strip().str.title()),
+        Column("balance", "NUMBER(10,2)", money),
+        Column("currency", "VARCHAR2(4)"),
+        Column("status", "VARCHAR2(20)"),
+        Column("opened_at", "DATE", to_ts_text, bind=TS_BIND),
+        Column("branch_id", "VARCHAR2(20)", upper_id),
+    )),
+    TableSpec("STG_MERCHANTS", "merchant_id", source="RAW_MERCHANTS", dedupe="exact", columns=(
+        Column("merchant_id", "VARCHAR2(20)", upper_id),
+        Column("name", "VARCHAR2(50)", title_str, not_null=True),
+        Column("mcc", "NUMBER(6)"),
+        Column("category", "VARCHAR2(50)", title_str),
+        Column("city", "VARCHAR2(20)"),
+        Column("state", "VARCHAR2(2)"),
+        Column("country_code", "VARCHAR2(2)"),
+    )),
+    TableSpec("STG_BRANCHES", "branch_id", source="RAW_BRANCHES", dedupe="exact", columns=(
+        Column("branch_id", "VARCHAR2(20)", upper_id),
+        Column("name", "VARCHAR2(50)", title_str, not_null=True),
+        Column("city", "VARCHAR2(20)"),
+        Column("state", "VARCHAR2(2)"),
+        Column("country", "VARCHAR2(20)"),
+    )),
+    TableSpec("STG_GEOS", "geo_id", source="RAW_GEOS", dedupe="key", dropna_key=True, columns=(
+        Column("geo_id", "VARCHAR2(20)", upper_id),
+        Column("ip", "VARCHAR2(15)", not_null=True),
+        Column("city", "VARCHAR2(20)"),
+        Column("region", "VARCHAR2(2)"),
+        Column("country", "VARCHAR2(20)"),
+        Column("lat", "NUMBER(9,6)", to_number),
+        Column("lon", "NUMBER(9,6)", to_number),
+    )),
+    TableSpec("STG_TRANSACTIONS", "txn_id", source="RAW_TRANSACTIONS", dedupe="exact", columns=(
+        Column("txn_id", "VARCHAR2(30)", upper_id),
+        Column("src_account_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("dst_account_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("merchant_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("amount", "NUMBER(10,2)", to_number),
+        Column("currency", "VARCHAR2(10)"),
+        Column("channel", "VARCHAR2(10)"),
+        _ts("ts"),
+        Column("status", "VARCHAR2(120)", upper_id),
+        LOAD_TS,
+    )),
+    TableSpec("STG_LOGINS", "login_id", source="RAW_LOGINS", dedupe="exact", columns=(
+        Column("login_id", "VARCHAR2(30)", upper_id),
+        Column("customer_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("device_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("geo_id", "VARCHAR2(20)", upper_id, not_null=True),
+        Column("channel", "VARCHAR2(10)"),
+        _ts("ts"),
+        Column("result", "VARCHAR2(120)"),
+        LOAD_TS,
+    )),
+    TableSpec("STG_DEVICES", "device_id", source="RAW_DEVICES", dedupe="exact", columns=(
+        Column("device_id", "VARCHAR2(30)", upper_id),
+        Column("fingerprint", "VARCHAR2(100)", not_null=True),
+        Column("os", "VARCHAR2(50)", upper_id, not_null=True),
+        Column("model", "VARCHAR2(100)", not_null=True),
+    )),
+    TableSpec("STG_SANCTIONS", "sanction_id", source="RAW_SANCTIONS", dedupe="exact", columns=(
+        Column("sanction_id", "VARCHAR2(30)", upper_id),
+        Column("list_name", "VARCHAR2(100)", not_null=True),
+        Column("entity_name", "VARCHAR2(100)", title_str, not_null=True),
+        Column("risk_level", "VARCHAR2(10)", not_null=True),
+    )),
+    # written by aml_scan; staged from RAW_ALERTS once alerts_raw.csv is landed
+    TableSpec("ALERTS", "alert_id", source="RAW_ALERTS", dedupe="key", columns=(
+        Column("alert_id", "VARCHAR2(40)", upper_id),
+        Column("case_id", "VARCHAR2(36)", update=False),
+        Column("entity_type", "VARCHAR2(20)", upper_id),
+        Column("entity_id", "VARCHAR2(20)", upper_id),
+        Column("reason_code", "VARCHAR2(40)"),
+        Column("risk_score", "NUMBER(5,2)", to_number),
+        # aml_scan binds datetimes, so no TO_TIMESTAMP around this one
+        Column("created_ts", "TIMESTAMP", lambda s: pd.to_datetime(s, errors="coerce"), update=False),
+    )),
+    TableSpec("STG_CUSTOMER_ENTITY", "customer_id", columns=(
+        Column("customer_id", "VARCHAR2(20)"),
+        Column("entity_id", "VARCHAR2(20)", not_null=True),
+        Column("cluster_size", "NUMBER(10)"),
+    )),
+]}
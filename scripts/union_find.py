@@ -0,0 +1,49 @@
+from array import array
+
+
+class UnionFind:
+    """Array-backed disjoint sets over dense integer ids 0..n-1.
+
+    Uses union by size and path halving, so find/union are effectively O(1)
+    amortised. `add()` grows the structure for streaming use.
+    """
+
+    def __init__(self, n=0):
+        self.parent = array("q", range(n))
+        self.size = array("q", [1]) * n
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add(self):
+        idx = len(self.parent)
+        self.parent.append(idx)
+        self.size.append(1)
+        return idx
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return ra
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return ra
+
+    def union_many(self, left, right):
+        for a, b in zip(left, right):
+            self.union(int(a), int(b))
+
+    def component_size(self, x):
+        return self.size[self.find(x)]
+
+    def labels(self):
+        return [self.find(i) for i in range(len(self.parent))]
@@ -0,0 +1,26 @@
+from device_linkage import LinkageGraph, MAX_DEVICE_CUSTOMERS
+
+
+def test_hub_device_stops_linking_and_splits_its_component():
+    g = LinkageGraph()
+    g.add_login("C-A", "D-PAIR")
+    g.add_login("C-B", "D-PAIR")
+    for i in range(MAX_DEVICE_CUSTOMERS - 1):
+        g.add_login(f"C-{i}", "D-KIOSK")
+    g.add_login("C-A", "D-KIOSK")
+    assert g.lookup("C-0")["customers"] == MAX_DEVICE_CUSTOMERS + 1
+
+    # one customer too many: the kiosk becomes a hub and its component falls apart
+    g.add_login("C-LAST", "D-KIOSK")
+    assert g.lookup("C-A")["customers"] == 2
+    assert g.lookup("C-0")["customers"] == 1
+    assert g.lookup("C-LAST")["customers"] == 1
+    assert "HUB_DEVICE" in g.lookup("C-0")["flags"]
+    assert "LARGE_RING" not in g.lookup("C-0")["flags"]
+
+    # same answer as a graph that knew about the hub from the start
+    h = LinkageGraph()
+    h.add_hubs("D", ["D-KIOSK"])
+    for c, d in [("C-A", "D-PAIR"), ("C-B", "D-PAIR"), ("C-A", "D-KIOSK"), ("C-0", "D-KIOSK")]:
+        h.add_login(c, d)
+    assert h.lookup("C-A")["customers"] == 2 and h.lookup("C-0")["customers"] == 1
@@ -0,0 +1,13 @@
+from replay import Pushback, paced
+
+
+def test_paced_steps_do_not_drop_events():
+    events = Pushback((i, "LOGINS", {}, {}) for i in range(50))
+    seen = []
+    while True:
+        step = [ev[0] for ev in paced(events, rate=2000, seconds=0.005, speedup=0)]
+        if not step:
+            break
+        seen += step
+    assert seen == list(range(50))
+    assert not events.held
@@ -0,0 +1,80 @@
+import base64
+
+import pytest
+
+from risk_scores import IndexedMaxHeap, RiskScores
+
+
+def _alert(alert_id, ts, risk=50.0):
+    return {"alert_id": alert_id, "entity_type": "CUSTOMER", "entity_id": "C-1",
+            "risk_score": risk, "created_ts": ts}
+
+
+def test_withdrawing_newer_alert_keeps_older_one():
+    rs = RiskScores(half_life_days=30)
+    rs.apply(_alert("new", "2025-06-01T00:00:00"))
+    rs.apply(_alert("old", "2022-01-01T00:00:00"))
+    rs.apply(_alert("new", "2025-06-01T00:00:00"), deleted=True)
+    assert [k for k, _ in rs.top("CUSTOMER")] == ["C-1"]
+    assert rs.score("CUSTOMER", "C-1") > 0
+
+    rs.apply(_alert("old", "2022-01-01T00:00:00"), deleted=True)
+    assert rs.top("CUSTOMER") == []
+
+
+def test_checkpoint_round_trip(tmp_path):
+    rs = RiskScores({"A-1": "C-1"}, half_life_days=30)
+    rs.apply({"alert_id": "x", "entity_type": "ACCOUNT", "entity_id": "a-1", "risk_score": 40,
+              "created_ts": "2025-01-01T00:00:00"})
+    rs.save(str(tmp_path / "risk.json"))
+    back = RiskScores.load(str(tmp_path / "risk.json"))
+    assert back.top("CUSTOMER") == rs.top("CUSTOMER") == [("C-1", 40.0)]
+    assert back.top("ACCOUNT") == [("A-1", 40.0)]
+
+
+def test_heap_remove_missing_key_is_noop():
+    h = IndexedMaxHeap()
+    h.set("a", 1.0)
+    h.remove("b")
+    assert h.top(5) == [("a", 1.0)]
+
+
+def test_debezium_default_encodings():
+    rs = RiskScores(half_life_days=30)
+    # precise-mode NUMBER(5,2) 51.23 and adaptive-mode TIMESTAMP(6) micros
+    raw = base64.b64encode((5123).to_bytes(2, "big", signed=True)).decode()
+    rs.apply({"ALERT_ID": "x", "ENTITY_TYPE": "CUSTOMER", "ENTITY_ID": "C-1",
+              "RISK_SCORE": raw, "CREATED_TS": 1735689600000000})
+    assert rs.top("CUSTOMER") == [("C-1", 51.23)]
+    assert rs.last_ts == 1735689600.0
+
+
+def test_malformed_update_keeps_previous_contribution():
+    rs = RiskScores(half_life_days=30)
+    rs.apply(_alert("x", "2025-01-01T00:00:00", risk=30.0))
+    with pytest.raises(ValueError):
+        rs.apply(_alert("x", "not a timestamp"))
+    assert rs.top("CUSTOMER") == [("C-1", 30.0)]
+
+
+def test_account_opened_after_build_rolls_up_to_its_customer(tmp_path):
+    rs = RiskScores({"A-1": "C-1"}, half_life_days=30)
+    rs.apply({"alert_id": "x", "entity_type": "TRANSACTION", "entity_id": "A-9", "risk_score": 40,
+              "created_ts": "2025-01-01T00:00:00"})
+    assert rs.top("CUSTOMER") == []
+
+    # the account arrives on the ACCOUNTS topic after its first alert
+    rs.apply_entity("orcl.APPUSER.ACCOUNTS", {"ACCOUNT_ID": "A-9", "CUSTOMER_ID": "C-1", "__op": "c"})
+    assert rs.top("CUSTOMER") == [("C-1", 40.0)]
+    assert rs.top("ACCOUNT") == [("A-9", 40.0)]
+    assert rs.top("TRANSACTION") == []
+
+    # moved to another customer: the score moves with it
+    rs.apply_entity("orcl.APPUSER.ACCOUNTS", {"ACCOUNT_ID": "A-9", "CUSTOMER_ID": "C-2", "__op": "u"})
+    assert rs.top("CUSTOMER") == [("C-2", 40.0)]
+
+    rs.save(str(tmp_path / "risk.json"))
+    back = RiskScores.load(str(tmp_path / "risk.json"))
+    back.apply({"alert_id": "x", "entity_type": "TRANSACTION", "entity_id": "A-9", "risk_score": 40,
+                "created_ts": "2025-01-01T00:00:00"}, deleted=True)
+    assert back.top("CUSTOMER") == [] and back.by_entity == {}
@@ -0,0 +1,29 @@
+import json
+
+from cdc_decode import decode
+from scoring_workers import PartitionState, score_transactions, THRESHOLD, MIN_DAILY
+
+T0_MS = 1722384000000   # 2024-07-31T00:00:00Z
+
+
+def _txn(i, amount, ts_ms):
+    # value as the connector emits it with decimal.handling.mode=double and
+    # time.precision.mode=connect, after the ExtractNewRecordState SMT
+    return json.dumps({
+        "TXN_ID": f"T-{i}", "SRC_ACCOUNT_ID": "A-1", "DST_ACCOUNT_ID": "A-2", "MERCHANT_ID": "M-1",
+        "AMOUNT": amount, "CURRENCY": "USD", "CHANNEL": "ECOM", "TS": ts_ms, "STATUS": "APPROVED",
+        "__op": "c", "__table": "TRANSACTIONS", "__source_ts_ms": ts_ms + 5, "__deleted": "false",
+    }).encode()
+
+
+def test_connector_shaped_transactions_raise_alerts():
+    near = THRESHOLD * 0.95
+    raws = [_txn(i, near, T0_MS + i * 600_000) for i in range(MIN_DAILY)]
+    batch = decode("TRANSACTIONS", raws)
+    assert batch["AMOUNT"].dtype == "f8" and batch["AMOUNT"][0] == near
+    assert str(batch["TS"][0]) == "2024-07-31T00:00:00.000"
+
+    alerts = score_transactions(PartitionState("orcl.APPUSER.TRANSACTIONS", 0), batch)
+    reasons = {a["reason_code"] for a in alerts}
+    assert "STRUCTURING" in reasons
+    assert all(a["entity_id"] == "A-1" for a in alerts)
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from dataCleaning import cleanStr, phoneFix, parse_date, clean_time
+from table_specs import clean_str, phone, to_date, to_ts_text
+
+VALUES = pd.Series([
+    None, "", " ", "  a  b\tc ", "(555) 123-4567", "1-555-123-4567", "555-1234",
+    "2024-07-31", " 2024-07-31 ", "2024-09-30T01:25:00", "2024-09-13 04:24:22",
+    "01/06/2024", "06/21/2025 16:28", "02/30/2024", "13/01/2024", "2024-07-31T01:25:00+0200", "soon",
+], dtype=object)
+
+
+def _same(got, expected):
+    return all((pd.isna(g) and pd.isna(e)) or (g == e and type(g) is type(e))
+               for g, e in zip(got, expected))
+
+
+def test_vectorized_rules_match_the_per_value_helpers():
+    assert _same(clean_str(VALUES), [cleanStr(v) for v in VALUES])
+    assert _same(phone(VALUES), [phoneFix(v) for v in VALUES])
+    assert _same(to_date(VALUES), [parse_date(v) for v in VALUES])
+    assert _same(to_ts_text(VALUES), [clean_time(v) for v in VALUES])
+
+
+def test_merge_updates_load_ts_only_when_a_column_changed():
+    from table_specs import SPECS, merge_sql
+    sql = merge_sql(SPECS["STG_TRANSACTIONS"])
+    matched = sql[sql.index("WHEN MATCHED"):sql.index("WHEN NOT MATCHED")]
+    assert "d.load_ts          = s.load_ts" in matched
+    where = matched[matched.index("WHERE"):]
+    assert "DECODE(d.amount, s.amount, 0, 1) = 1" in where
+    assert "load_ts" not in where and "txn_id" not in where